@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Бенчмарки бота напоминаний.
+
+Запуск: python bench.py <сценарий> [параметры], список сценариев: python bench.py -h
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from aiohttp import ClientSession
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from bot import (
+    AppConfig, Base, BotComponents, ReminderCreate, ReminderModel, ReminderService,
+    TimeInputParser, WebhookServer, create_missing_indexes
+)
+
+
+def fill_reminders(path: str, rows: int, users: int, chunk: int = 50_000):
+    """Заполнение базы rows напоминаниями users пользователей, половина в прошлом"""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    now = datetime.now(AppConfig.Scheduler.TIMEZONE).replace(tzinfo=None)
+    rnd = random.Random(42)
+
+    with engine.begin() as conn:
+        for start in range(0, rows, chunk):
+            conn.execute(insert(ReminderModel), [
+                {
+                    "user_id": rnd.randrange(users),
+                    "chat_id": 0,
+                    "text": "bench",
+                    "remind_time": now + timedelta(minutes=rnd.randint(-43_200, 43_200)),
+                    "job_id": f"bench_{i}",
+                }
+                for i in range(start, min(start + chunk, rows))
+            ])
+    engine.dispose()
+
+
+def drop_indexes(path: str):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        for index in ReminderModel.__table__.indexes:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    engine.dispose()
+
+
+def add_indexes(path: str):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        create_missing_indexes(conn)
+    engine.dispose()
+
+
+async def time_list_queries(path: str, users: int, queries: int) -> list:
+    """Время get_user_reminders для случайных пользователей, мс"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    components = SimpleNamespace(
+        engine=engine,
+        async_session=sessionmaker(engine, expire_on_commit=False, class_=AsyncSession),
+    )
+    service = ReminderService(components)
+    rnd = random.Random(7)
+    timings = []
+    for _ in range(queries):
+        started = time.perf_counter()
+        await service.get_user_reminders(rnd.randrange(users))
+        timings.append((time.perf_counter() - started) * 1000)
+    await engine.dispose()
+    return timings
+
+
+def report(label: str, timings: list):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<16} median {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms")
+
+
+def bench_indexes(args):
+    """Задержка списка напоминаний пользователя без индексов и с ними"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "reminders.db")
+        started = time.perf_counter()
+        fill_reminders(path, args.rows, args.users)
+        print(f"filled {args.rows} rows in {time.perf_counter() - started:.1f} s")
+
+        drop_indexes(path)
+        report("without indexes", asyncio.run(time_list_queries(path, args.users, args.queries)))
+
+        started = time.perf_counter()
+        add_indexes(path)
+        print(f"migrated indexes in {time.perf_counter() - started:.1f} s")
+        report("with indexes", asyncio.run(time_list_queries(path, args.users, args.queries)))
+
+
+def sample_updates(count: int, users: int) -> list:
+    """Синтетические обновления: текстовые сообщения от users пользователей"""
+    now = int(time.time())
+    return [
+        {
+            "update_id": i,
+            "message": {
+                "message_id": i,
+                "date": now,
+                "chat": {"id": i % users, "type": "private"},
+                "from": {"id": i % users, "is_bot": False, "first_name": "bench"},
+                "text": "через 30 минут",
+            },
+        }
+        for i in range(count)
+    ]
+
+
+class CountingBot:
+    """Заглушка бота: считает обработанные обновления вместо вызова обработчиков"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.processed = 0
+
+    async def process_new_updates(self, updates):
+        await asyncio.sleep(self.delay)
+        self.processed += len(updates)
+
+
+async def replay_updates(url: str, secret: str, updates: list, concurrency: int) -> list:
+    """POST обновлений на webhook, возвращает коды ответов"""
+    queue = asyncio.Queue()
+    for update in updates:
+        queue.put_nowait(update)
+    statuses = []
+
+    async def worker(session: ClientSession):
+        while not queue.empty():
+            update = queue.get_nowait()
+            async with session.post(
+                url, json=update, headers={"X-Telegram-Bot-Api-Secret-Token": secret}
+            ) as response:
+                statuses.append(response.status)
+
+    async with ClientSession() as session:
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+    return statuses
+
+
+async def run_webhook(args):
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            updates = [json.loads(line) for line in f if line.strip()]
+    else:
+        updates = sample_updates(args.count, args.users)
+
+    server = None
+    url = args.url
+    if not url:
+        # Локальный сервер с заглушкой вместо бота
+        AppConfig.Webhook.HOST, AppConfig.Webhook.PORT = "127.0.0.1", args.port
+        bot = CountingBot(args.delay)
+        server = WebhookServer(bot)
+        await server.start()
+        url = f"http://127.0.0.1:{args.port}{AppConfig.Webhook.PATH}"
+
+    started = time.perf_counter()
+    statuses = await replay_updates(url, args.secret or AppConfig.Webhook.SECRET_TOKEN,
+                                    updates, args.concurrency)
+    accepted = time.perf_counter() - started
+    if server:
+        await server.stop()
+    total = time.perf_counter() - started
+
+    codes = {code: statuses.count(code) for code in sorted(set(statuses))}
+    print(f"posted {len(updates)} updates in {accepted:.2f} s "
+          f"({len(updates) / accepted:.0f} updates/s), responses {codes}")
+    if server:
+        print(f"processed {bot.processed} updates in {total:.2f} s")
+
+
+def bench_webhook(args):
+    """Прогон JSON-обновлений через webhook-сервер"""
+    asyncio.run(run_webhook(args))
+
+
+async def run_db_load(workers: int, duration: float) -> dict:
+    """Параллельные create_reminder + get_user_reminders в течение duration секунд"""
+    components = BotComponents()
+    await components.init_db()
+    components.scheduler.start(paused=True)
+    service = ReminderService(components)
+    counts = {"create": 0, "list": 0}
+    deadline = time.perf_counter() + duration
+
+    async def worker(user_id: int):
+        remind_time = datetime.now(AppConfig.Scheduler.TIMEZONE) + timedelta(days=1)
+        while time.perf_counter() < deadline:
+            await service.create_reminder(ReminderCreate(
+                user_id=user_id, chat_id=user_id, text="bench", remind_time=remind_time
+            ))
+            counts["create"] += 1
+            await service.get_user_reminders(user_id)
+            counts["list"] += 1
+
+    await asyncio.gather(*(worker(user_id) for user_id in range(workers)))
+    components.scheduler.shutdown(wait=False)
+    await components.cleanup()
+    return counts
+
+
+def bench_sqlite(args):
+    """Пропускная способность create/list при параллельной нагрузке: PRAGMA по умолчанию и профиль"""
+    AppConfig.Bot.TOKEN = "0:bench"
+    AppConfig.Scheduler.BATCH_MODE = args.batch
+    tuned = AppConfig.Database.SQLITE_PRAGMAS
+    jobstores = AppConfig.Scheduler.JOBSTORES
+    cwd = os.getcwd()
+    for label, pragmas in (("sqlite defaults", {}), ("tuned pragmas", tuned)):
+        AppConfig.Database.SQLITE_PRAGMAS = pragmas
+        with tempfile.TemporaryDirectory() as tmp:
+            # reminders.db задана относительным путём, а движок jobs.db создан
+            # при импорте bot, поэтому на каждый прогон - свой jobstore
+            AppConfig.Scheduler.JOBSTORES = {
+                'default': SQLAlchemyJobStore(
+                    url=f"sqlite:///{os.path.join(tmp, 'jobs.db')}",
+                    engine_options={'connect_args': {'check_same_thread': False}}
+                ),
+                'memory': MemoryJobStore()
+            }
+            os.chdir(tmp)
+            try:
+                counts = asyncio.run(run_db_load(args.workers, args.duration))
+            finally:
+                os.chdir(cwd)
+        print(f"{label:<16} create {counts['create'] / args.duration:7.0f}/s   "
+              f"list {counts['list'] / args.duration:7.0f}/s")
+    AppConfig.Database.SQLITE_PRAGMAS = tuned
+    AppConfig.Scheduler.JOBSTORES = jobstores
+
+
+async def run_timer(count: int, duration: float) -> str:
+    """count напоминаний, равномерно наступающих за duration секунд; гистограмма опозданий"""
+    components = BotComponents()
+    await components.init_db()
+    components.scheduler.start()
+    service = ReminderService(components)
+    await service.restore_reminders()
+
+    now = datetime.now(AppConfig.Scheduler.TIMEZONE)
+    await service.create_reminders_bulk(
+        {"user_id": i, "chat_id": i, "text": "bench",
+         "remind_time": now + timedelta(seconds=1 + duration * i / count)}
+        for i in range(count)
+    )
+    await asyncio.sleep(duration + AppConfig.Scheduler.TICK_INTERVAL + 1)
+
+    components.scheduler.shutdown(wait=False)
+    await components.timer.stop()
+    await components.cleanup()
+    return str(components.lateness)
+
+
+def bench_timer(args):
+    """Опоздание срабатываний пакетного режима: выборка каждым тиком и таймер с упреждением"""
+    AppConfig.Bot.TOKEN = "0:bench"
+    AppConfig.Scheduler.BATCH_MODE = True
+    cwd = os.getcwd()
+    for label, prefetch in (("tick dispatch", False), ("prefetch timer", True)):
+        AppConfig.Scheduler.PREFETCH = prefetch
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                histogram = asyncio.run(run_timer(args.count, args.duration))
+            finally:
+                os.chdir(cwd)
+        print(f"{label:<16} {histogram}")
+
+
+# Типичный ввод пользователей, включая ошибочный
+PARSER_CORPUS = [
+    "через 30 минут", "через 2 часа", "через 1 день", "через 3 дня", "через 10 мин",
+    "через 5 min", "через 3 hours", "in 45 minutes", "in 2 days",
+    "в 15:00", "в 9", "завтра в 9:30", "сегодня в 23:59", "tomorrow at 8",
+    "25.12.2026 10:00", "25.12 10:00", "18:30", "7:05",
+    "через 1 час 30 минут", "через полчаса", "in 1 hour and 15 minutes", "через 1ч 30м",
+    "в пятницу в 9", "on monday at 10:00", "послезавтра", "завтра", "15 марта в 10:00",
+    "31.02.2026 10:00", "в 25:00", "через пару минут", "купить хлеба",
+]
+
+
+def bench_parser(args):
+    """Скорость TimeInputParser.parse на корпусе ввода времени"""
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            corpus = [line.rstrip("\n") for line in f if line.strip()]
+    else:
+        corpus = PARSER_CORPUS
+
+    total = 0.0
+    for sample in corpus:
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            result = TimeInputParser.parse(sample)
+        elapsed = time.perf_counter() - started
+        total += elapsed
+        status = "ok" if result else "rejected"
+        print(f"{sample!r:<24} {elapsed / args.repeat * 1e6:7.2f} us   {status}")
+    parses = len(corpus) * args.repeat
+    print(f"{parses} parses in {total:.2f} s ({parses / total:.0f} parses/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    scenarios = parser.add_subparsers(dest="scenario", required=True)
+
+    indexes = scenarios.add_parser("indexes", help=bench_indexes.__doc__)
+    indexes.add_argument("--rows", type=int, default=1_000_000)
+    indexes.add_argument("--users", type=int, default=10_000)
+    indexes.add_argument("--queries", type=int, default=200)
+    indexes.set_defaults(func=bench_indexes)
+
+    webhook = scenarios.add_parser("webhook", help=bench_webhook.__doc__)
+    webhook.add_argument("--file", help="JSONL с обновлениями, по умолчанию синтетические")
+    webhook.add_argument("--url", help="адрес запущенного бота, по умолчанию локальный сервер")
+    webhook.add_argument("--secret", help="секретный токен webhook")
+    webhook.add_argument("--count", type=int, default=10_000)
+    webhook.add_argument("--users", type=int, default=1_000)
+    webhook.add_argument("--concurrency", type=int, default=40)
+    webhook.add_argument("--delay", type=float, default=0.01, help="имитация обработки, с")
+    webhook.add_argument("--port", type=int, default=8443)
+    webhook.set_defaults(func=bench_webhook)
+
+    sqlite = scenarios.add_parser("sqlite", help=bench_sqlite.__doc__)
+    sqlite.add_argument("--workers", type=int, default=20)
+    sqlite.add_argument("--duration", type=float, default=10)
+    sqlite.add_argument("--batch", action="store_true", help="пакетный режим, без jobs.db")
+    sqlite.set_defaults(func=bench_sqlite)
+
+    time_parser = scenarios.add_parser("parser", help=bench_parser.__doc__)
+    time_parser.add_argument("--file", help="по строке ввода в строке, по умолчанию встроенный корпус")
+    time_parser.add_argument("--repeat", type=int, default=20_000)
+    time_parser.set_defaults(func=bench_parser)
+
+    timer = scenarios.add_parser("timer", help=bench_timer.__doc__)
+    timer.add_argument("--count", type=int, default=2_000)
+    timer.add_argument("--duration", type=float, default=20)
+    timer.set_defaults(func=bench_timer)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,24 +8,56 @@ Telegram бот для управления напоминаниями с исп
 - Loguru для логирования
 """
 
+import argparse
 import asyncio
+import bisect
+import heapq
+import hmac
+import json
+import pickle
+import random
+import re
+import time
 import sync_tasks
-from datetime import datetime, timedelta
+from calendar import monthrange
+from collections import OrderedDict, deque
+from functools import lru_cache, partial
+from itertools import islice
+from datetime import datetime, timedelta, tzinfo
 from enum import Enum, auto
-from typing import AsyncGenerator, Dict, List, Optional
+from typing import (
+    AsyncGenerator, Awaitable, Callable, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple,
+    Union
+)
 
 import pytz
+from aiohttp import web
 from loguru import logger
-from pydantic import BaseModel, validator
-from sqlalchemy import Column, DateTime, Integer, String, select, func, delete
+from pydantic import BaseModel, Field, validator
+from sqlalchemy import (
+    Column, DateTime, Engine, Index, Integer, String, and_, or_, select, func, delete, event, insert,
+    inspect, update
+)
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
-from telebot import asyncio_filters
+from telebot import asyncio_filters, asyncio_helper
 from telebot.async_telebot import AsyncTeleBot
-from telebot.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
+from telebot.asyncio_helper import ApiTelegramException
+from telebot.types import (
+    CallbackQuery, ChosenInlineResult, InlineKeyboardButton, InlineKeyboardMarkup, InlineQuery,
+    InlineQueryResultArticle, InputTextMessageContent, Message, Update
+)
+from telebot.util import extract_arguments
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.job import Job
+from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.util import datetime_to_utc_timestamp
 
 
 ## Конфигурация приложения
@@ -33,20 +65,109 @@ class AppConfig:
     class Database:
         URL = "sqlite+aiosqlite:///reminders.db"
         ECHO = False
+        BULK_CHUNK = 1000  # строк в одной транзакции массовой вставки
+        # Применяется к каждому новому соединению с reminders.db и jobs.db
+        SQLITE_PRAGMAS = {
+            "journal_mode": "WAL",  # читатели не блокируются записью
+            "synchronous": "NORMAL",  # fsync только при checkpoint WAL
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -64 * 1024,  # в KiB, т.е. 64 MiB
+            "temp_store": "MEMORY",
+            "busy_timeout": 5000,  # ms
+        }
 
     class Bot:
         TOKEN = "YOUR_TOKEN"
         TIMEOUT = 30
         STATE_TTL = 3600  # 1 hour in seconds
+        STATE_MAX_USERS = 100_000  # активных диалогов в памяти
+        STATE_SWEEP_INTERVAL = 60  # seconds
+        # "memory" - в памяти процесса, "database" - общая таблица user_states
+        # для нескольких процессов бота
+        STATE_BACKEND = "memory"
+        # Планировщик, восстановление, outbox и архивация работают только в
+        # процессе с RUN_SCHEDULER = True, иначе каждый процесс отправил бы
+        # каждое напоминание. Остальные процессы (False) принимают обновления
+        # и записывают задания в общий jobs.db, не выполняя их; периодические
+        # задания (очистка user_states, метрики) у них тоже не запускаются
+        RUN_SCHEDULER = True
+        PAGE_SIZE = 10  # напоминаний на странице списка
+        LIST_TEXT_LIMIT = 300  # символов текста в списке, чтобы страница влезла в 4096
+        LIST_CACHE_TTL = 300  # seconds
+        LIST_CACHE_MAX_USERS = 10_000  # пользователей с закэшированным списком
+        UPDATE_WORKERS = 50  # пользователей, обрабатываемых параллельно
+        MAX_QUEUED_UPDATES = 1000  # предел очередей до притормаживания приёма
+        METRICS_INTERVAL = 60  # seconds
+        CONNECTION_LIMIT = 100  # keep-alive соединений в общем HTTP-пуле
+
+    class Webhook:
+        ENABLED = False  # webhook вместо long polling
+        URL = ""  # публичный адрес бота, например https://bot.example.com
+        PATH = "/webhook"
+        HOST = "0.0.0.0"
+        PORT = 5000
+        SECRET_TOKEN = "change-me"  # заголовок X-Telegram-Bot-Api-Secret-Token
+        MAX_CONNECTIONS = 40  # параллельных соединений со стороны Telegram
+        MAX_CONCURRENCY = 100  # одновременно обрабатываемых обновлений
+
+    class Delivery:
+        GLOBAL_RATE = 30  # сообщений в секунду на бота
+        GLOBAL_BURST = 30
+        CHAT_RATE = 1  # сообщений в секунду в один чат
+        CHAT_BURST = 1
+        MAX_IN_FLIGHT = 50  # одновременных запросов sendMessage
+        CLAIM_BATCH = 500  # строк outbox в очереди отправки одновременно
+        POLL_INTERVAL = 1  # seconds, опрос outbox на случай повторов
+        LEASE = 600  # seconds, после которых неподтверждённая строка забирается снова
+        MAX_ATTEMPTS = 8
+        RETRY_BASE = 2  # seconds, удваивается с каждой попыткой
+        RETRY_MAX = 900  # seconds
+        # Напоминания одного чата, сработавшие почти одновременно, уходят одним
+        # сообщением "⏰ Напоминания:" (не длиннее 4096 символов и DIGEST_MAX_ITEMS пунктов)
+        DIGEST = True
+        DIGEST_WINDOW = 0.5  # seconds, ожидание соседних напоминаний после новой записи
+        DIGEST_MAX_ITEMS = 30  # по 3 кнопки "отложить" на пункт при лимите 100 кнопок
+
+    class Retention:
+        ENABLED = True
+        INTERVAL = 600  # seconds между проходами
+        KEEP_FOR = 86400  # сработавшее напоминание остаётся в reminders ещё сутки
+        ARCHIVE = True  # переносить в reminders_archive, иначе удалять
+        BATCH_SIZE = 500  # строк в одной транзакции
+        INCREMENTAL_VACUUM = True  # SQLite: auto_vacuum=INCREMENTAL
+        VACUUM_PAGES = 1000  # страниц, возвращаемых за проход
 
     class Scheduler:
         JOBSTORES = {
             'default': SQLAlchemyJobStore(
                 url='sqlite:///jobs.db',
                 engine_options={'connect_args': {'check_same_thread': False}}
-            )
+            ),
+            'memory': MemoryJobStore()  # служебные задания, не требующие сохранения
+        }
+        JOB_DEFAULTS = {
+            'misfire_grace_time': 300,  # пиковые минуты не должны терять задания
+            'coalesce': False
         }
         TIMEZONE = pytz.timezone("Europe/Moscow")
+        # Пакетный режим: вместо задания на каждое напоминание одно
+        # периодическое задание раз в TICK_INTERVAL секунд выбирает
+        # наступившие напоминания из таблицы reminders. Расписание при этом
+        # целиком хранится в reminders.db, jobs.db не открывается
+        BATCH_MODE = False
+        TICK_INTERVAL = 5
+        # Упреждающая выборка пакетного режима: тик загружает напоминания
+        # следующих LOOKAHEAD секунд в кучу в памяти, и они срабатывают по
+        # таймеру без обращения к базе; без неё тик сам рассылает наступившие
+        PREFETCH = True
+        LOOKAHEAD = 60  # seconds, больше TICK_INTERVAL
+        RESTORE_CHUNK = 5000  # напоминаний в одной порции восстановления
+        RECONCILE_ON_START = True  # сверять jobstore с reminders вместо пересборки
+        # Номер процесса (0-1023), входит в job_id: у каждого процесса, создающего
+        # напоминания одновременно с другими, он должен быть свой
+        WORKER_ID = 0
+        IMPORT_WORKER_ID = 1023  # по умолчанию для import_reminders.py
+        JOB_ID_ATTEMPTS = 3  # вставок с новым job_id при совпадении с чужим
 
 
 ## Модели данных
@@ -63,7 +184,107 @@ class ReminderModel(Base):
     text = Column(String(500), nullable=False)
     remind_time = Column(DateTime, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
-    job_id = Column(String(100), nullable=False, unique=True)
+    job_id = Column(String(32), nullable=False, unique=True)
+    # Правило повтора (см. Recurrence), для разовых напоминаний NULL;
+    # remind_time повторяющегося - ближайшее срабатывание
+    recurrence = Column(String(64))
+
+    __table_args__ = (
+        # get_user_reminders: фильтр по user_id, диапазон и сортировка по remind_time
+        Index("ix_reminders_user_id_remind_time", "user_id", "remind_time"),
+        # restore_reminders и dispatch_due: диапазон по remind_time
+        Index("ix_reminders_remind_time", "remind_time"),
+    )
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Обработчик события connect: профиль производительности SQLite"""
+    cursor = dbapi_connection.cursor()
+    if AppConfig.Retention.INCREMENTAL_VACUUM:
+        # auto_vacuum меняется без VACUUM только в пустом файле и до перехода в WAL
+        cursor.execute("PRAGMA page_count")
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    for name, value in AppConfig.Database.SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+
+def use_sqlite_pragmas(engine: Engine):
+    """Подключение профиля PRAGMA к синхронному движку SQLite"""
+    if engine.dialect.name == "sqlite" and not event.contains(engine, "connect", apply_sqlite_pragmas):
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+
+
+def create_missing_indexes(connection):
+    """Миграция существующих баз: create_all не добавляет индексы в уже созданные таблицы"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def create_missing_columns(connection):
+    """Миграция существующих баз: добавление новых столбцов (только допускающих NULL)"""
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+
+
+class SchedulerStateModel(Base):
+    """Состояние пакетного планировщика, хранится рядом с напоминаниями"""
+    __tablename__ = "scheduler_state"
+
+    key = Column(String(50), primary_key=True)
+    value = Column(DateTime, nullable=False)
+
+
+class DeliveryModel(Base):
+    """Outbox отправки: одна строка на каждое сработавшее напоминание (текст без оформления)"""
+    __tablename__ = "deliveries"
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(Integer, nullable=False)
+    text = Column(String(4096), nullable=False)
+    status = Column(String(10), nullable=False, default="pending")  # pending/sending/sent/failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    sent_at = Column(DateTime)
+    # Разовое напоминание, к сообщению которого добавляются кнопки "отложить"
+    reminder_id = Column(Integer)
+    # Время срабатывания напоминания - для опоздания в момент отправки
+    remind_time = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_deliveries_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+
+class ReminderArchiveModel(Base):
+    """Сработавшие напоминания, перенесённые из reminders"""
+    __tablename__ = "reminders_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, nullable=False)
+    chat_id = Column(Integer, nullable=False)
+    text = Column(String(500), nullable=False)
+    remind_time = Column(DateTime, nullable=False)
+    created_at = Column(DateTime)
+    job_id = Column(String(32), nullable=False)
+    archived_at = Column(DateTime, server_default=func.now())
+
+
+class UserStateModel(Base):
+    """Сериализованный UserContext для хранилища состояний в базе"""
+    __tablename__ = "user_states"
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    payload = Column(String(4096), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
 
 
 class ReminderCreate(BaseModel):
@@ -72,6 +293,7 @@ class ReminderCreate(BaseModel):
     chat_id: int
     text: str
     remind_time: datetime
+    recurrence: Optional[str] = None
 
     @validator('text')
     def validate_text(cls, v):
@@ -81,10 +303,22 @@ class ReminderCreate(BaseModel):
 
     @validator('remind_time')
     def validate_remind_time(cls, v):
+        # В базе время хранится без зоны, поэтому приводим всё к зоне бота
+        if v.tzinfo is None:
+            v = AppConfig.Scheduler.TIMEZONE.localize(v)
+        else:
+            v = v.astimezone(AppConfig.Scheduler.TIMEZONE)
         if v <= datetime.now(AppConfig.Scheduler.TIMEZONE):
             raise ValueError("Remind time must be in the future")
         return v
 
+    @validator('recurrence')
+    def validate_recurrence(cls, v):
+        if not v:
+            return None
+        Recurrence.validate(v)
+        return v
+
 
 ## Состояния бота
 class BotState(Enum):
@@ -97,7 +331,884 @@ class UserContext(BaseModel):
     """Контекст пользовательской сессии"""
     state: BotState
     data: Dict = {}
-    created_at: datetime = datetime.now()
+    created_at: datetime = Field(default_factory=datetime.now)
+
+    def dump(self) -> str:
+        """Компактная сериализация для внешнего хранилища"""
+        return json.dumps(
+            {"s": self.state.name, "d": self.data, "t": self.created_at.timestamp()},
+            ensure_ascii=False, separators=(",", ":")
+        )
+
+    @classmethod
+    def load(cls, raw: str) -> "UserContext":
+        payload = json.loads(raw)
+        return cls(
+            state=BotState[payload["s"]],
+            data=payload["d"],
+            created_at=datetime.fromtimestamp(payload["t"])
+        )
+
+
+## Хранилище состояний
+class StateStore:
+    """Интерфейс хранилища контекстов пользователей"""
+
+    async def get(self, user_id: int) -> Optional[UserContext]:
+        raise NotImplementedError
+
+    async def set(self, user_id: int, context: UserContext):
+        raise NotImplementedError
+
+    async def delete(self, user_id: int):
+        raise NotImplementedError
+
+    async def sweep(self):
+        """Периодическое удаление истёкших контекстов"""
+
+
+class MemoryStateStore(StateStore):
+    """
+    Контексты пользователей в памяти процесса с ограничением размера и TTL.
+
+    Контекст истекает через STATE_TTL секунд после created_at. Записи
+    упорядочены по последнему обращению: при превышении STATE_MAX_USERS
+    вытесняется самая давняя, а фоновая очистка снимает истёкшие записи
+    с начала очереди, не просматривая всё хранилище.
+    """
+
+    def __init__(self, ttl: int = AppConfig.Bot.STATE_TTL,
+                 max_size: int = AppConfig.Bot.STATE_MAX_USERS):
+        self.ttl = timedelta(seconds=ttl)
+        self.max_size = max_size
+        self._items: OrderedDict[int, Tuple[UserContext, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    async def get(self, user_id: int) -> Optional[UserContext]:
+        item = self._items.get(user_id)
+        if item is None:
+            return None
+        context = item[0]
+        if datetime.now() - context.created_at > self.ttl:
+            del self._items[user_id]
+            return None
+        self._items[user_id] = (context, time.monotonic())
+        self._items.move_to_end(user_id)
+        return context
+
+    async def set(self, user_id: int, context: UserContext):
+        self._items[user_id] = (context, time.monotonic())
+        self._items.move_to_end(user_id)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    async def delete(self, user_id: int):
+        self._items.pop(user_id, None)
+
+    async def sweep(self):
+        """Удаление контекстов, к которым не обращались дольше TTL"""
+        deadline = time.monotonic() - self.ttl.total_seconds()
+        removed = 0
+        while self._items:
+            user_id, (_, accessed) = next(iter(self._items.items()))
+            if accessed > deadline:
+                break
+            del self._items[user_id]
+            removed += 1
+        if removed:
+            logger.debug(f"Expired {removed} user contexts, {len(self._items)} left")
+
+
+class SqlStateStore(StateStore):
+    """
+    Контексты пользователей в таблице user_states базы напоминаний.
+
+    Позволяет нескольким процессам бота обслуживать один диалог: любое
+    обновление читает и сохраняет контекст через общую базу.
+    """
+
+    def __init__(self, async_session: sessionmaker, ttl: int = AppConfig.Bot.STATE_TTL):
+        self.async_session = async_session
+        self.ttl = timedelta(seconds=ttl)
+
+    async def get(self, user_id: int) -> Optional[UserContext]:
+        async with self.async_session() as session:
+            result = await session.execute(
+                select(UserStateModel.payload)
+                .where(UserStateModel.user_id == user_id)
+                .where(UserStateModel.expires_at > datetime.now())
+            )
+            payload = result.scalar_one_or_none()
+        return UserContext.load(payload) if payload else None
+
+    async def set(self, user_id: int, context: UserContext):
+        async with self.async_session() as session:
+            await session.merge(UserStateModel(
+                user_id=user_id,
+                payload=context.dump(),
+                expires_at=context.created_at + self.ttl
+            ))
+            await session.commit()
+
+    async def delete(self, user_id: int):
+        async with self.async_session() as session:
+            await session.execute(delete(UserStateModel).where(UserStateModel.user_id == user_id))
+            await session.commit()
+
+    async def sweep(self):
+        async with self.async_session() as session:
+            result = await session.execute(
+                delete(UserStateModel).where(UserStateModel.expires_at <= datetime.now())
+            )
+            await session.commit()
+        if result.rowcount:
+            logger.debug(f"Expired {result.rowcount} user contexts")
+
+
+## Кэш списков напоминаний
+ListView = Tuple[str, InlineKeyboardMarkup]  # готовый текст и клавиатура страницы
+
+
+class ReminderListCache:
+    """
+    Отрисованные страницы списка напоминаний по пользователям.
+
+    Запись живёт не дольше LIST_CACHE_TTL и не дольше срабатывания первого
+    напоминания на странице, после которого список уже другой. Создание,
+    удаление и отправка напоминаний сбрасывают все страницы пользователя.
+    Кэш локален для процесса: при нескольких процессах бота расхождение
+    ограничено TTL.
+    """
+
+    def __init__(self, ttl: int = AppConfig.Bot.LIST_CACHE_TTL,
+                 max_size: int = AppConfig.Bot.LIST_CACHE_MAX_USERS):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items: OrderedDict[int, Dict[str, Tuple[ListView, float]]] = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, user_id: int, key: str) -> Optional[ListView]:
+        pages = self._items.get(user_id)
+        item = pages and pages.get(key)
+        if not item or item[1] <= time.monotonic():
+            if item:
+                del pages[key]
+            self.stats["misses"] += 1
+            return None
+        self._items.move_to_end(user_id)
+        self.stats["hits"] += 1
+        return item[0]
+
+    def set(self, user_id: int, key: str, view: ListView, valid_until: Optional[datetime] = None):
+        expires = time.monotonic() + self.ttl
+        if valid_until is not None:
+            left = (valid_until - datetime.now(AppConfig.Scheduler.TIMEZONE)).total_seconds()
+            expires = min(expires, time.monotonic() + left)
+        self._items.setdefault(user_id, {})[key] = (view, expires)
+        self._items.move_to_end(user_id)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def invalidate(self, *user_ids: int):
+        for user_id in user_ids:
+            if self._items.pop(user_id, None) is not None:
+                self.stats["invalidations"] += 1
+
+
+## Доставка сообщений
+DeliveryCallback = Callable[[Optional[Exception]], None]
+# chat_id, текст, reminder_id для кнопок "отложить", remind_time (местное время без зоны)
+Outgoing = Tuple[int, str, Optional[int], Optional[datetime]]
+Claimed = Tuple[int, int, Optional[datetime]]  # id строки outbox, число прошлых попыток, remind_time
+
+
+class TokenBucket:
+    """Token bucket: rate токенов в секунду, не больше capacity в запасе"""
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def try_acquire(self) -> float:
+        """Забирает токен и возвращает 0, либо возвращает время ожидания в секундах"""
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        """Ожидание свободного токена"""
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Опустошение корзины на seconds секунд (ответ 429 с retry_after)"""
+        self.tokens = 0
+        self.updated = max(self.updated, time.monotonic() + seconds)
+
+    @property
+    def is_full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+class DeliveryDispatcher:
+    """
+    Очередь исходящих сообщений между планировщиком и ботом.
+
+    Сообщения копятся в очередях по chat_id, чаты ждут своей очереди в куче
+    по времени готовности. Отправка идёт не быстрее глобальной корзины и
+    корзины конкретного чата, ответ 429 возвращает сообщение в начало очереди
+    чата и откладывает чат на retry_after секунд. Итог отправки (None или
+    исключение) передаётся в on_done, если он указан.
+    """
+
+    def __init__(self, bot: AsyncTeleBot):
+        self.bot = bot
+        self.global_bucket = TokenBucket(
+            AppConfig.Delivery.GLOBAL_RATE, AppConfig.Delivery.GLOBAL_BURST
+        )
+        self.chat_buckets: Dict[int, TokenBucket] = {}
+        self.pending: Dict[int, Deque[
+            Tuple[str, Optional[InlineKeyboardMarkup], Optional[DeliveryCallback]]
+        ]] = {}
+        self.ready: List[Tuple[float, int]] = []  # куча (время готовности, chat_id)
+        self.stats = {"sent": 0, "throttled": 0, "failed": 0}
+
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(AppConfig.Delivery.MAX_IN_FLIGHT)
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight = set()
+
+    def start(self):
+        """Запуск цикла отправки в текущем event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановка цикла отправки с дожиданием уже начатых запросов"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        if self.pending:
+            logger.warning(f"Delivery stopped with {self.queued} undelivered messages")
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self.pending.values())
+
+    def submit(self, chat_id: int, text: str, on_done: Optional[DeliveryCallback] = None,
+               reply_markup: Optional[InlineKeyboardMarkup] = None):
+        """Постановка сообщения в очередь отправки"""
+        queue = self.pending.get(chat_id)
+        if queue is None:
+            self.pending[chat_id] = deque([(text, reply_markup, on_done)])
+            self._schedule(chat_id, time.monotonic())
+        else:
+            queue.append((text, reply_markup, on_done))
+
+    def _schedule(self, chat_id: int, ready_at: float):
+        heapq.heappush(self.ready, (ready_at, chat_id))
+        self._wakeup.set()
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(
+                AppConfig.Delivery.CHAT_RATE, AppConfig.Delivery.CHAT_BURST
+            )
+        return bucket
+
+    async def _run(self):
+        while True:
+            if not self.ready:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            ready_at, chat_id = self.ready[0]
+            delay = ready_at - time.monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self.ready)
+            wait = self._chat_bucket(chat_id).try_acquire()
+            if wait:
+                self._schedule(chat_id, time.monotonic() + wait)
+                continue
+
+            await self.global_bucket.acquire()
+            await self._slots.acquire()
+            text, reply_markup, on_done = self.pending[chat_id].popleft()
+            task = asyncio.create_task(self._send(chat_id, text, reply_markup, on_done))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, chat_id: int, text: str, reply_markup: Optional[InlineKeyboardMarkup],
+                    on_done: Optional[DeliveryCallback]):
+        error = None
+        try:
+            await self.bot.send_message(chat_id, text, reply_markup=reply_markup)
+            self.stats["sent"] += 1
+        except ApiTelegramException as e:
+            if e.error_code == 429:
+                retry_after = (e.result_json.get("parameters") or {}).get("retry_after", 1)
+                self.stats["throttled"] += 1
+                logger.warning(f"Flood limit for {chat_id}, retry after {retry_after}s")
+                self.pending[chat_id].appendleft((text, reply_markup, on_done))
+                self._chat_bucket(chat_id).pause(retry_after)
+                on_done = None
+            else:
+                error = e
+        except Exception as e:
+            error = e
+
+        if error is not None:
+            self.stats["failed"] += 1
+            logger.error(f"Failed to send reminder to {chat_id}: {error}")
+        if on_done is not None:
+            on_done(error)
+        self._slots.release()
+        self._after_send(chat_id)
+
+    def _after_send(self, chat_id: int):
+        if self.pending[chat_id]:
+            self._schedule(chat_id, time.monotonic())
+            return
+        del self.pending[chat_id]
+        if self._chat_bucket(chat_id).is_full:
+            del self.chat_buckets[chat_id]
+        else:
+            asyncio.get_running_loop().call_later(
+                AppConfig.Delivery.CHAT_BURST / AppConfig.Delivery.CHAT_RATE,
+                self._forget_chat, chat_id
+            )
+
+    def _forget_chat(self, chat_id: int):
+        if chat_id not in self.pending:
+            self.chat_buckets.pop(chat_id, None)
+
+
+class DeliveryOutbox:
+    """
+    Outbox отправки с семантикой at-least-once.
+
+    Каждое сработавшее напоминание сначала сохраняется строкой deliveries,
+    и только затем уходит в DeliveryDispatcher. Цикл outbox забирает
+    готовые строки одним UPDATE ... RETURNING (статус sending с арендой на
+    LEASE секунд), отмечает доставленные одной транзакцией, а неудачные
+    возвращает в pending с экспоненциальной задержкой и jitter. Строка,
+    чья аренда истекла (процесс упал посреди отправки), забирается заново.
+
+    При Delivery.DIGEST строки одного чата из одной выборки объединяются
+    в сводку; после новой записи выборка ждёт DIGEST_WINDOW, чтобы собрать
+    напоминания, сработавшие в ту же секунду. Итог отправки сводки
+    относится ко всем её строкам.
+
+    lateness - опоздание успешной отправки относительно remind_time строки,
+    включая окно сводки, ожидание выборки, ограничение скорости и повторы.
+    """
+
+    def __init__(self, async_session: sessionmaker, dispatcher: DeliveryDispatcher):
+        self.async_session = async_session
+        self.dispatcher = dispatcher
+        self._in_flight = set()
+        self._sent: List[int] = []
+        self._failed: Dict[int, int] = {}  # id -> число неудачных попыток
+        self._wakeup = asyncio.Event()
+        self._fresh = False  # появились новые строки, а не только итоги отправки
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"messages": 0, "coalesced": 0}  # coalesced - сэкономленные отправки
+        self.lateness = LatenessHistogram()
+
+    @staticmethod
+    def add(session: AsyncSession, batch: List[Outgoing]):
+        """Добавление сообщений Outgoing в outbox в транзакции вызывающего"""
+        now = datetime.now(AppConfig.Scheduler.TIMEZONE)
+        session.add_all([
+            DeliveryModel(chat_id=chat_id, text=text, reminder_id=reminder_id,
+                          remind_time=remind_time, next_attempt_at=now)
+            for chat_id, text, reminder_id, remind_time in batch
+        ])
+
+    def notify(self):
+        """Пробуждение цикла после фиксации новых строк"""
+        self._fresh = True
+        self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановка: фиксация результатов и возврат незавершённых строк в pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._flush()
+        if self._in_flight:
+            async with self.async_session() as session:
+                await session.execute(
+                    update(DeliveryModel)
+                    .where(DeliveryModel.id.in_(self._in_flight))
+                    .where(DeliveryModel.status == "sending")
+                    .values(status="pending",
+                            next_attempt_at=datetime.now(AppConfig.Scheduler.TIMEZONE))
+                )
+                await session.commit()
+            self._in_flight.clear()
+
+    async def _run(self):
+        while True:
+            try:
+                await self._flush()
+                room = AppConfig.Delivery.CLAIM_BATCH - len(self._in_flight)
+                claimed = await self._claim(room) if room > 0 else []
+                # Строка с истёкшей арендой может быть ещё в очереди отправки
+                rows = [row for row in claimed if row.id not in self._in_flight]
+                for chat_id, items in self._group(rows):
+                    self._in_flight.update(row.id for row in items)
+                    text, markup = BotUI.reminder_message(
+                        [(row.text, row.reminder_id) for row in items]
+                    )
+                    self.dispatcher.submit(
+                        chat_id, text,
+                        partial(self._done, [(row.id, row.attempts, row.remind_time) for row in items]),
+                        markup
+                    )
+                    self.stats["messages"] += 1
+                    self.stats["coalesced"] += len(items) - 1
+                if room > 0 and len(claimed) == room:
+                    continue
+            except Exception as e:
+                logger.error(f"Outbox iteration failed: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), AppConfig.Delivery.POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            if self._fresh and AppConfig.Delivery.DIGEST:
+                await asyncio.sleep(AppConfig.Delivery.DIGEST_WINDOW)
+            self._fresh = False
+
+    @staticmethod
+    def _group(rows) -> Iterable[Tuple[int, list]]:
+        """Разбиение строк на сообщения: по одной или сводками по чатам"""
+        if not AppConfig.Delivery.DIGEST:
+            return [(row.chat_id, [row]) for row in rows]
+
+        chats: Dict[int, list] = {}
+        for row in sorted(rows, key=lambda row: row.id):
+            chats.setdefault(row.chat_id, []).append(row)
+
+        messages = []
+        limit = AppConfig.Delivery.DIGEST_MAX_ITEMS
+        for chat_id, items in chats.items():
+            chunk, length = [], BotUI.DIGEST_HEADER_LENGTH
+            for row in items:
+                line = BotUI.digest_line_length(len(chunk) + 1, row.text)
+                if chunk and (length + line > 4096 or len(chunk) >= limit):
+                    messages.append((chat_id, chunk))
+                    chunk, length = [], BotUI.DIGEST_HEADER_LENGTH
+                    line = BotUI.digest_line_length(1, row.text)
+                chunk.append(row)
+                length += line
+            messages.append((chat_id, chunk))
+        return messages
+
+    async def _claim(self, limit: int):
+        now = datetime.now(AppConfig.Scheduler.TIMEZONE)
+        due = (
+            select(DeliveryModel.id)
+            .where(DeliveryModel.status.in_(("pending", "sending")))
+            .where(DeliveryModel.next_attempt_at <= now)
+            .order_by(DeliveryModel.next_attempt_at)
+            .limit(limit)
+        )
+        async with self.async_session() as session:
+            result = await session.execute(
+                update(DeliveryModel)
+                .where(DeliveryModel.id.in_(due.scalar_subquery()))
+                .values(status="sending",
+                        next_attempt_at=now + timedelta(seconds=AppConfig.Delivery.LEASE))
+                .returning(DeliveryModel.id, DeliveryModel.chat_id, DeliveryModel.text,
+                           DeliveryModel.attempts, DeliveryModel.reminder_id, DeliveryModel.remind_time)
+                .execution_options(synchronize_session=False)
+            )
+            rows = result.all()
+            await session.commit()
+        return rows
+
+    def _done(self, deliveries: List[Claimed], error: Optional[Exception]):
+        now = datetime.now(AppConfig.Scheduler.TIMEZONE).replace(tzinfo=None)
+        for delivery_id, attempts, remind_time in deliveries:
+            self._in_flight.discard(delivery_id)
+            if error is None:
+                self._sent.append(delivery_id)
+                if remind_time is not None:
+                    self.lateness.observe((now - remind_time).total_seconds())
+            else:
+                self._failed[delivery_id] = attempts + 1
+        self._wakeup.set()
+
+    @staticmethod
+    def backoff(attempts: int) -> float:
+        """Экспоненциальная задержка перед попыткой attempts + 1, с jitter ±50%"""
+        delay = min(AppConfig.Delivery.RETRY_BASE * 2 ** (attempts - 1), AppConfig.Delivery.RETRY_MAX)
+        return delay * random.uniform(0.5, 1.5)
+
+    async def _flush(self):
+        if not self._sent and not self._failed:
+            return
+        sent, self._sent = self._sent, []
+        failed, self._failed = self._failed, {}
+        now = datetime.now(AppConfig.Scheduler.TIMEZONE)
+
+        async with self.async_session() as session:
+            if sent:
+                await session.execute(
+                    update(DeliveryModel)
+                    .where(DeliveryModel.id.in_(sent))
+                    .values(status="sent", sent_at=now)
+                )
+            for delivery_id, attempts in failed.items():
+                exhausted = attempts >= AppConfig.Delivery.MAX_ATTEMPTS
+                await session.execute(
+                    update(DeliveryModel)
+                    .where(DeliveryModel.id == delivery_id)
+                    .values(
+                        status="failed" if exhausted else "pending",
+                        attempts=attempts,
+                        next_attempt_at=now + timedelta(seconds=self.backoff(attempts))
+                    )
+                )
+                if exhausted:
+                    logger.error(f"Delivery {delivery_id} failed after {attempts} attempts")
+            await session.commit()
+
+
+## Конвейер обновлений
+class UpdatePipeline:
+    """
+    Очереди входящих обновлений по пользователям.
+
+    Обновления одного пользователя обрабатываются строго по очереди, разных
+    пользователей - параллельно, но не более чем workers одновременно. Когда
+    в очередях набирается max_queued обновлений, wait_capacity() блокирует
+    приём новых до разгрузки.
+    """
+
+    USER_FIELDS = ("message", "edited_message", "callback_query", "inline_query",
+                   "chosen_inline_result")
+
+    def __init__(self, process: Callable[[List[Update]], Awaitable[None]],
+                 workers: int = AppConfig.Bot.UPDATE_WORKERS,
+                 max_queued: int = AppConfig.Bot.MAX_QUEUED_UPDATES):
+        self._process = process
+        self._workers = asyncio.Semaphore(workers)
+        self._max_queued = max_queued
+        self._queues: Dict[int, Deque[Tuple[Update, asyncio.Future, float]]] = {}
+        self._tasks = set()
+        self._capacity = asyncio.Event()
+        self._capacity.set()
+        self.queued = 0
+        self.stats = {"processed": 0, "failed": 0, "max_queued": 0,
+                      "backpressure_waits": 0, "queue_wait_total": 0.0}
+
+    @classmethod
+    def user_key(cls, update: Update) -> int:
+        """Пользователь, к которому относится обновление; иначе само обновление"""
+        for field in cls.USER_FIELDS:
+            event = getattr(update, field, None)
+            if event is not None and event.from_user is not None:
+                return event.from_user.id
+        return -update.update_id
+
+    @property
+    def active_users(self) -> int:
+        return len(self._queues)
+
+    async def wait_capacity(self):
+        """Ожидание свободного места в очередях"""
+        if not self._capacity.is_set():
+            self.stats["backpressure_waits"] += 1
+            await self._capacity.wait()
+
+    def submit(self, update: Update) -> asyncio.Future:
+        """Постановка обновления в очередь пользователя; future завершится после обработки"""
+        future = asyncio.get_running_loop().create_future()
+        key = self.user_key(update)
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+            task = asyncio.create_task(self._drain(key, queue))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        queue.append((update, future, time.monotonic()))
+
+        self.queued += 1
+        self.stats["max_queued"] = max(self.stats["max_queued"], self.queued)
+        if self.queued >= self._max_queued:
+            self._capacity.clear()
+        return future
+
+    async def _drain(self, key: int, queue: Deque[Tuple[Update, asyncio.Future, float]]):
+        try:
+            while queue:
+                update, future, enqueued = queue.popleft()
+                async with self._workers:
+                    self.stats["queue_wait_total"] += time.monotonic() - enqueued
+                    try:
+                        await self._process([update])
+                        self.stats["processed"] += 1
+                    except Exception as e:
+                        self.stats["failed"] += 1
+                        logger.error(f"Failed to process update {update.update_id}: {e}")
+                    finally:
+                        if not future.done():
+                            future.set_result(None)
+                self.queued -= 1
+                if self.queued < self._max_queued:
+                    self._capacity.set()
+        finally:
+            del self._queues[key]
+
+
+class PipelinedTeleBot(AsyncTeleBot):
+    """AsyncTeleBot, пропускающий обновления через UpdatePipeline"""
+
+    def __init__(self, token: str, **kwargs):
+        super().__init__(token, **kwargs)
+        self.pipeline = UpdatePipeline(super().process_new_updates)
+
+    async def get_updates(self, *args, **kwargs):
+        # Long polling не запрашивает новые обновления, пока очереди переполнены
+        await self.pipeline.wait_capacity()
+        return await super().get_updates(*args, **kwargs)
+
+    async def process_new_updates(self, updates: List[Update]):
+        await asyncio.gather(*(self.pipeline.submit(update) for update in updates))
+
+
+## Таймер напоминаний
+class LatenessHistogram:
+    """
+    Распределение опоздания относительно remind_time: срабатывания (постановки
+    в outbox) у BotComponents.lateness и отправки у DeliveryOutbox.lateness
+    """
+
+    BOUNDS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 60)  # seconds
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.total = 0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        seconds = max(seconds, 0.0)
+        self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+        self.total += 1
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Верхняя граница корзины, в которую попадает квантиль q"""
+        rank, seen = q * self.total, 0
+        for bound, count in zip(self.BOUNDS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def __str__(self) -> str:
+        if not self.total:
+            return "no firings"
+        labels = [f"<={bound * 1000:g}ms" for bound in self.BOUNDS] + [f">{self.BOUNDS[-1]:g}s"]
+        buckets = ", ".join(
+            f"{label}: {count}" for label, count in zip(labels, self.counts) if count
+        )
+        return (
+            f"{buckets}; p50 <= {self.quantile(0.5) * 1000:g}ms, "
+            f"p99 <= {self.quantile(0.99) * 1000:g}ms, max {self.max * 1000:.0f}ms"
+        )
+
+
+class TimerEntry(NamedTuple):
+    """Снимок напоминания в таймере, remind_time - местное время без зоны"""
+    id: Optional[int]
+    chat_id: int
+    text: str
+    remind_time: datetime
+    job_id: str
+    recurrence: Optional[str]
+
+
+class ReminderTimer:
+    """
+    Ближайшие напоминания пакетного режима в куче по (remind_time, job_id).
+
+    Тик загружает окно вперёд (load), создание и перенос напоминаний внутри
+    загруженного окна попадают сюда сразу (schedule), удаление снимает запись
+    (cancel). Наступившие записи срабатывают пачкой через колбэк fire без
+    чтения базы. Время - местное без зоны, как в reminders.
+
+    Очередная загрузка читает окно от read_from - границы сработавшего на
+    момент прошлой загрузки, а не от fired_until: строку, вставленную другим
+    процессом уже после загрузки со временем до следующего тика, таймер
+    иначе пропустил бы. Сработавшие после read_from записи помнятся
+    в _fired и при повторном чтении пропускаются.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, str]] = []
+        self._entries: Dict[str, TimerEntry] = {}
+        self._cancelled: set = set()  # удалённые во время загрузки окна
+        self._fired: Dict[str, datetime] = {}  # job_id -> remind_time сработавших после read_from
+        self.loaded_until: Optional[datetime] = None
+        self.fired_until: Optional[datetime] = None
+        self.read_from: Optional[datetime] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._fire: Optional[Callable[[List[TimerEntry], datetime], Awaitable[None]]] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def local_now() -> datetime:
+        return datetime.now(AppConfig.Scheduler.TIMEZONE).replace(tzinfo=None)
+
+    @staticmethod
+    def _naive(value: datetime) -> datetime:
+        if value.tzinfo is None:
+            return value
+        return value.astimezone(AppConfig.Scheduler.TIMEZONE).replace(tzinfo=None)
+
+    def _push(self, row):
+        entry = TimerEntry(
+            row.id, row.chat_id, row.text, self._naive(row.remind_time), row.job_id, row.recurrence
+        )
+        current = self._entries.get(entry.job_id)
+        self._entries[entry.job_id] = entry
+        if current is not None and current.remind_time == entry.remind_time:
+            return
+        heapq.heappush(self._heap, (entry.remind_time, entry.job_id))
+        if self._heap[0][1] == entry.job_id:
+            self._wakeup.set()
+
+    def load(self, rows, until: datetime, read_from: datetime):
+        """
+        Строки окна (self.read_from, until]; уже сработавшие и удалённые
+        пропускаются. read_from - граница следующей загрузки: fired_until
+        на момент начала этого чтения
+        """
+        for row in rows:
+            if row.job_id in self._cancelled:
+                continue
+            if self._fired.get(row.job_id) != self._naive(row.remind_time):
+                self._push(row)
+        self._cancelled.clear()
+        self.loaded_until = max(until, self.loaded_until or until)
+        self.read_from = read_from
+        self._fired = {
+            job_id: fired_at for job_id, fired_at in self._fired.items() if fired_at > read_from
+        }
+
+    def schedule(self, row):
+        """Новое время напоминания; за пределами окна его подберёт следующая загрузка"""
+        if self.loaded_until is not None and self._naive(row.remind_time) <= self.loaded_until:
+            self._push(row)
+        else:
+            self._entries.pop(row.job_id, None)
+
+    def cancel(self, job_id: str):
+        # Запись в куче остаётся и пропускается при извлечении
+        self._entries.pop(job_id, None)
+        self._cancelled.add(job_id)
+
+    def start(self, fire: Callable[[List[TimerEntry], datetime], Awaitable[None]],
+              fired_until: datetime):
+        self._fire = fire
+        self.fired_until = self.loaded_until = self.read_from = self._naive(fired_until)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _pop_due(self, now: datetime) -> List[TimerEntry]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            remind_time, job_id = heapq.heappop(self._heap)
+            entry = self._entries.get(job_id)
+            if entry is not None and entry.remind_time == remind_time:
+                del self._entries[job_id]
+                self._fired[job_id] = remind_time
+                due.append(entry)
+        self.fired_until = max(now, self.fired_until or now)
+        return due
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = self.local_now()
+            due = self._pop_due(now)
+            if due:
+                try:
+                    await self._fire(due, now)
+                except Exception as e:
+                    # Транзакция не зафиксирована, записи вернутся в кучу
+                    logger.error(f"Failed to fire {len(due)} reminders: {e}")
+                    for entry in due:
+                        self._push(entry)
+                    await asyncio.sleep(1)
+                continue
+
+            timeout = None
+            if self._heap:
+                timeout = (self._heap[0][0] - self.local_now()).total_seconds()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
 
 
 ## Инициализация компонентов
@@ -111,83 +1222,289 @@ class BotComponents:
         self.async_session = sessionmaker(
             self.engine, expire_on_commit=False, class_=AsyncSession
         )
-
-        # Инициализация бота
-        self.bot = AsyncTeleBot(AppConfig.Bot.TOKEN)
+        use_sqlite_pragmas(self.engine.sync_engine)
+
+        # Инициализация бота: все запросы, включая отправку напоминаний,
+        # идут через одну aiohttp-сессию с пулом keep-alive соединений
+        asyncio_helper.REQUEST_LIMIT = AppConfig.Bot.CONNECTION_LIMIT
+        self.bot = PipelinedTeleBot(AppConfig.Bot.TOKEN)
+        if AppConfig.Scheduler.BATCH_MODE:
+            # Создание напоминания - одна транзакция в reminders.db
+            jobstores = {'default': MemoryJobStore(), 'memory': MemoryJobStore()}
+        else:
+            jobstores = AppConfig.Scheduler.JOBSTORES
+            for jobstore in jobstores.values():
+                if isinstance(jobstore, SQLAlchemyJobStore):
+                    use_sqlite_pragmas(jobstore.engine)
         self.scheduler = AsyncIOScheduler(
-            jobstores=AppConfig.Scheduler.JOBSTORES,
+            jobstores=jobstores,
+            job_defaults=AppConfig.Scheduler.JOB_DEFAULTS,
             timezone=AppConfig.Scheduler.TIMEZONE
         )
+        self.dispatcher = DeliveryDispatcher(self.bot)
+        self.outbox = DeliveryOutbox(self.async_session, self.dispatcher)
+        self.timer = ReminderTimer()
+        self.lateness = LatenessHistogram()
 
         # Хранилище состояний
-        self.user_contexts: Dict[int, UserContext] = {}
+        if AppConfig.Bot.STATE_BACKEND == "database":
+            self.user_contexts = SqlStateStore(self.async_session)
+        else:
+            self.user_contexts = MemoryStateStore()
+        self.list_cache = ReminderListCache()
 
     async def init_db(self):
         """Инициализация таблиц базы данных"""
         async with self.engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(create_missing_columns)
+            await conn.run_sync(create_missing_indexes)
+        if self.engine.dialect.name == "sqlite" and AppConfig.Retention.INCREMENTAL_VACUUM:
+            async with self.engine.connect() as conn:
+                mode = (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar()
+            if mode != 2:
+                # Новые файлы создаются в нужном режиме, старые переводятся
+                # полным VACUUM, который блокирует базу, - только вручную
+                logger.warning(
+                    "reminders.db is not in incremental auto_vacuum mode, space freed by retention "
+                    "is not returned; run 'python bot.py --vacuum' while the bot is stopped"
+                )
+
+    async def log_metrics(self):
+        """Периодический вывод метрик очередей"""
+        pipeline = self.bot.pipeline
+        logger.info(
+            f"Updates: queued {pipeline.queued}, active users {pipeline.active_users}, "
+            f"{pipeline.stats}; delivery: queued {self.dispatcher.queued}, {self.dispatcher.stats}, "
+            f"outbox {self.outbox.stats}, send lateness {self.outbox.lateness}; "
+            f"list cache: {len(self.list_cache)} users, {self.list_cache.stats}; "
+            f"timer: {len(self.timer)} queued, fire lateness {self.lateness}"
+        )
 
     async def cleanup(self):
         """Очистка ресурсов"""
+        if asyncio_helper.session_manager.session is not None:
+            await self.bot.close_session()
         await self.engine.dispose()
 
 
 ## Сервисный слой
+Cursor = Tuple[datetime, int]  # (remind_time, id) для постраничного списка
+
+
+class ReminderPage(NamedTuple):
+    """Страница списка напоминаний"""
+    reminders: List[ReminderModel]
+    has_prev: bool
+    has_next: bool
+
+
+class JobIdGenerator:
+    """
+    Монотонные job_id в духе snowflake без обращений к базе.
+
+    64 бита: миллисекунды от EPOCH_MS, 10 бит номера процесса и 12 бит
+    счётчика внутри миллисекунды. Шестнадцатеричная запись фиксированной
+    длины, поэтому строки сортируются в порядке создания.
+    """
+
+    EPOCH_MS = 1_700_000_000_000
+
+    def __init__(self, worker_id: int = AppConfig.Scheduler.WORKER_ID):
+        self.worker_id = worker_id & 0x3FF
+        self._last_ms = 0
+        self._sequence = 0
+
+    def next_id(self) -> str:
+        now_ms = int(time.time() * 1000)
+        if now_ms <= self._last_ms:
+            # Та же миллисекунда или часы ушли назад: продолжаем счётчик,
+            # при переполнении занимаем следующую миллисекунду
+            now_ms = self._last_ms
+            self._sequence = (self._sequence + 1) & 0xFFF
+            if self._sequence == 0:
+                now_ms += 1
+        else:
+            self._sequence = 0
+        self._last_ms = now_ms
+        value = ((now_ms - self.EPOCH_MS) << 22) | (self.worker_id << 12) | self._sequence
+        return f"r{value:016x}"
+
+
 class ReminderService:
-    def __init__(self, components: BotComponents):
+    # Столбцы, нужные для отправки и переноса повторяющихся напоминаний
+    SCHEDULE_COLUMNS = (
+        ReminderModel.id, ReminderModel.chat_id, ReminderModel.text, ReminderModel.remind_time,
+        ReminderModel.job_id, ReminderModel.recurrence
+    )
+
+    def __init__(self, components: BotComponents,
+                 worker_id: int = AppConfig.Scheduler.WORKER_ID):
         self.components = components
+        self.job_ids = JobIdGenerator(worker_id)
+        # Граница уже разосланных напоминаний для пакетного режима
+        self.dispatched_until = datetime.now(AppConfig.Scheduler.TIMEZONE)
 
     async def create_reminder(self, reminder: ReminderCreate) -> ReminderModel:
         """Создание нового напоминания"""
-        job_id = f"reminder_{reminder.user_id}_{int(datetime.now().timestamp())}"
-
-        try:
-            # Проверяем существование задания
-            if self.components.scheduler.get_job(job_id):
-                self.components.scheduler.remove_job(job_id)
-        except:
-            pass
-
-        async with self.components.async_session() as session:
+        for attempt in range(1, AppConfig.Scheduler.JOB_ID_ATTEMPTS + 1):
+            job_id = self.job_ids.next_id()
             reminder_model = ReminderModel(
                 user_id=reminder.user_id,
                 chat_id=reminder.chat_id,
                 text=reminder.text,
                 remind_time=reminder.remind_time,
-                job_id=job_id
+                job_id=job_id,
+                recurrence=reminder.recurrence
             )
-            session.add(reminder_model)
-            await session.commit()
-
+            async with self.components.async_session() as session:
+                session.add(reminder_model)
+                try:
+                    await session.commit()
+                    break
+                except IntegrityError as e:
+                    # job_id уже выдан процессом с тем же WORKER_ID
+                    if attempt == AppConfig.Scheduler.JOB_ID_ATTEMPTS:
+                        raise ValueError("Не удалось сохранить напоминание, попробуйте ещё раз") from e
+                    logger.warning(f"job_id {job_id} is taken, check WORKER_ID of bot processes")
+        self.components.list_cache.invalidate(reminder.user_id)
+
+        if not AppConfig.Scheduler.BATCH_MODE:
             self.components.scheduler.add_job(
                 sync_tasks.send_reminder,
                 trigger=DateTrigger(reminder.remind_time),
-                args=(reminder.chat_id, reminder.text),
+                args=self.job_args(reminder.chat_id, reminder.text, job_id),
                 id=job_id,
                 replace_existing=True
             )
+        else:
+            self.components.timer.schedule(reminder_model)
 
-            return reminder_model
+        return reminder_model
+
+    async def create_reminders_bulk(self, items: Iterable[Union[dict, ReminderCreate]],
+                                    chunk_size: int = AppConfig.Database.BULK_CHUNK) -> Tuple[int, int]:
+        """
+        Массовое создание напоминаний: проверка ReminderCreate, вставка порциями
+        по chunk_size строк одной транзакцией и регистрация заданий порцией.
+        Возвращает (создано, отклонено).
+        """
+        created = rejected = 0
+        chunk = []
+
+        for number, item in enumerate(items, 1):
+            try:
+                reminder = item if isinstance(item, ReminderCreate) else ReminderCreate(**item)
+            except (ValueError, TypeError) as e:
+                rejected += 1
+                logger.warning(f"Напоминание {number} отклонено: {e}")
+                continue
+
+            chunk.append({
+                "user_id": reminder.user_id,
+                "chat_id": reminder.chat_id,
+                "text": reminder.text,
+                "remind_time": reminder.remind_time,
+                "job_id": self.job_ids.next_id(),
+                "recurrence": reminder.recurrence,
+            })
+            if len(chunk) >= chunk_size:
+                inserted = await self._insert_chunk(chunk)
+                created += inserted
+                rejected += len(chunk) - inserted
+                chunk = []
+
+        if chunk:
+            inserted = await self._insert_chunk(chunk)
+            created += inserted
+            rejected += len(chunk) - inserted
+        return created, rejected
+
+    async def _insert_chunk(self, chunk: List[dict]) -> int:
+        """Вставка порции; при совпадении job_id с чужим порция повторяется с новыми id"""
+        for attempt in range(1, AppConfig.Scheduler.JOB_ID_ATTEMPTS + 1):
+            try:
+                async with self.components.async_session() as session:
+                    if AppConfig.Scheduler.BATCH_MODE:
+                        # id нужны таймеру (кнопки "отложить", перенос повторяющихся)
+                        result = await session.execute(
+                            insert(ReminderModel).returning(
+                                ReminderModel.id, sort_by_parameter_order=True),
+                            chunk
+                        )
+                        ids = result.scalars().all()
+                    else:
+                        await session.execute(insert(ReminderModel), chunk)
+                        ids = [None] * len(chunk)
+                    await session.commit()
+                break
+            except IntegrityError as e:
+                if attempt == AppConfig.Scheduler.JOB_ID_ATTEMPTS:
+                    logger.error(f"Порция из {len(chunk)} напоминаний отклонена: {e}")
+                    return 0
+                logger.warning("job_id collision in bulk insert, check WORKER_ID of processes")
+                for values in chunk:
+                    values["job_id"] = self.job_ids.next_id()
+        self.components.list_cache.invalidate(*{values["user_id"] for values in chunk})
+
+        rows = [ReminderModel(id=row_id, **values) for row_id, values in zip(ids, chunk)]
+        if not AppConfig.Scheduler.BATCH_MODE:
+            await asyncio.to_thread(self._register_jobs, rows)
+        else:
+            for row in rows:
+                self.components.timer.schedule(row)
+        return len(chunk)
+
+    async def get_user_reminders(self, user_id: int, after: Optional[Cursor] = None,
+                                 before: Optional[Cursor] = None,
+                                 limit: int = AppConfig.Bot.PAGE_SIZE) -> ReminderPage:
+        """
+        Страница активных напоминаний пользователя по курсору (remind_time, id):
+        следующая после after или предыдущая перед before. Один индексный
+        запрос на limit + 1 строк, лишняя строка показывает наличие продолжения.
+        """
+        query = (
+            select(ReminderModel)
+            .where(ReminderModel.user_id == user_id)
+            .where(ReminderModel.remind_time > datetime.now(AppConfig.Scheduler.TIMEZONE))
+            .limit(limit + 1)
+        )
+        if before:
+            query = query.where(or_(
+                ReminderModel.remind_time < before[0],
+                and_(ReminderModel.remind_time == before[0], ReminderModel.id < before[1])
+            )).order_by(ReminderModel.remind_time.desc(), ReminderModel.id.desc())
+        else:
+            if after:
+                query = query.where(or_(
+                    ReminderModel.remind_time > after[0],
+                    and_(ReminderModel.remind_time == after[0], ReminderModel.id > after[1])
+                ))
+            query = query.order_by(ReminderModel.remind_time, ReminderModel.id)
 
-    async def get_user_reminders(self, user_id: int) -> List[ReminderModel]:
-        """Получение активных напоминаний пользователя"""
         async with self.components.async_session() as session:
-            result = await session.execute(
-                select(ReminderModel)
-                .where(ReminderModel.user_id == user_id)
-                .where(ReminderModel.remind_time > datetime.now(AppConfig.Scheduler.TIMEZONE))
-                .order_by(ReminderModel.remind_time)
-            )
-            return result.scalars().all()
+            result = await session.execute(query)
+            reminders = result.scalars().all()
+
+        if before and not reminders:
+            # Предыдущая страница целиком уже сработала, а более поздние
+            # напоминания могут остаться
+            return await self.get_user_reminders(user_id, limit=limit)
+
+        has_more = len(reminders) > limit
+        reminders = reminders[:limit]
+        if before:
+            return ReminderPage(reminders[::-1], has_prev=has_more, has_next=True)
+        return ReminderPage(reminders, has_prev=after is not None, has_next=has_more)
 
     async def delete_reminder(self, reminder_id: int) -> bool:
         """Удаление напоминания"""
         async with self.components.async_session() as session:
             result = await session.execute(
-                select(ReminderModel.job_id)
+                select(ReminderModel.job_id, ReminderModel.user_id)
                 .where(ReminderModel.id == reminder_id)
             )
-            job_id = result.scalar_one_or_none()
+            job_id, user_id = result.one_or_none() or (None, None)
 
             if job_id:
                 await session.execute(
@@ -195,115 +1512,967 @@ class ReminderService:
                     .where(ReminderModel.id == reminder_id)
                 )
                 await session.commit()
+                self.components.list_cache.invalidate(user_id)
 
-                try:
-                    self.components.scheduler.remove_job(job_id)
-                except Exception as e:
-                    logger.error(f"Failed to remove job {job_id}: {e}")
+                if not AppConfig.Scheduler.BATCH_MODE:
+                    try:
+                        self.components.scheduler.remove_job(job_id)
+                    except Exception as e:
+                        logger.error(f"Failed to remove job {job_id}: {e}")
+                else:
+                    self.components.timer.cancel(job_id)
 
                 return True
             return False
 
-    async def send_reminder(self, chat_id: int, text: str):
-        """Отправка напоминания пользователю"""
-        try:
-            await self.components.bot.send_message(chat_id, f"⏰ Напоминание: {text}")
-        except Exception as e:
-            logger.error(f"Failed to send reminder to {chat_id}: {e}")
+    async def compact_reminders(self):
+        """Перенос сработавших напоминаний в архив (или удаление) небольшими транзакциями"""
+        cutoff = datetime.now(AppConfig.Scheduler.TIMEZONE) - timedelta(
+            seconds=AppConfig.Retention.KEEP_FOR)
+        batch_size = AppConfig.Retention.BATCH_SIZE
+        columns = [
+            ReminderModel.id, ReminderModel.user_id, ReminderModel.chat_id, ReminderModel.text,
+            ReminderModel.remind_time, ReminderModel.created_at, ReminderModel.job_id
+        ]
+        moved = 0
+
+        while True:
+            async with self.components.async_session() as session:
+                result = await session.execute(
+                    select(ReminderModel.id)
+                    .where(ReminderModel.remind_time < cutoff)
+                    .where(ReminderModel.recurrence.is_(None))
+                    .order_by(ReminderModel.remind_time)
+                    .limit(batch_size)
+                )
+                ids = result.scalars().all()
+                if not ids:
+                    break
+
+                if AppConfig.Retention.ARCHIVE:
+                    await session.execute(
+                        insert(ReminderArchiveModel).from_select(
+                            [column.key for column in columns],
+                            select(*columns).where(ReminderModel.id.in_(ids))
+                        )
+                    )
+                await session.execute(delete(ReminderModel).where(ReminderModel.id.in_(ids)))
+                await session.commit()
 
-    async def restore_reminders(self):
-        """Восстановление напоминаний при старте"""
-        # Очищаем все существующие задания
-        self.components.scheduler.remove_all_jobs()
+            moved += len(ids)
+            if len(ids) < batch_size:
+                break
+            # Между транзакциями отдаём управление обработчикам и отправке
+            await asyncio.sleep(0)
 
+        # Доставленные строки outbox больше не нужны
         async with self.components.async_session() as session:
             result = await session.execute(
-                select(ReminderModel)
-                .where(ReminderModel.remind_time > datetime.now(AppConfig.Scheduler.TIMEZONE))
+                delete(DeliveryModel)
+                .where(DeliveryModel.status == "sent")
+                .where(DeliveryModel.sent_at < cutoff)
             )
-            reminders = result.scalars().all()
+            await session.commit()
+        if result.rowcount:
+            logger.info(f"Retention: purged {result.rowcount} delivered outbox rows")
+
+        if self.components.engine.dialect.name == "sqlite":
+            async with self.components.engine.connect() as conn:
+                # execute выполняет PRAGMA incremental_vacuum по одной странице за шаг,
+                # executescript драйвера доводит его до конца
+                raw = await conn.get_raw_connection()
+                await raw.driver_connection.executescript(
+                    f"PRAGMA incremental_vacuum({AppConfig.Retention.VACUUM_PAGES})"
+                )
 
-            for reminder in reminders:
-                try:
-                    self.components.scheduler.add_job(
-                        sync_tasks.send_reminder,
-                        trigger=DateTrigger(reminder.remind_time),
-                        args=(reminder.chat_id, reminder.text),
-                        id=reminder.job_id,
-                        replace_existing=True  # Добавлено для перезаписи
+        if moved:
+            action = "archived" if AppConfig.Retention.ARCHIVE else "deleted"
+            logger.info(f"Retention: {action} {moved} fired reminders")
+
+    async def send_reminder(self, chat_id: int, text: str, job_id: Optional[str] = None):
+        """Постановка напоминания в outbox, повторяющееся переносится на следующее срабатывание"""
+        if job_id is None:
+            await self.send_reminders([(chat_id, text, None, None)])
+            return
+
+        now = datetime.now(AppConfig.Scheduler.TIMEZONE).replace(tzinfo=None)
+        async with self.components.async_session() as session:
+            result = await session.execute(
+                select(*self.SCHEDULE_COLUMNS).where(ReminderModel.job_id == job_id)
+            )
+            row = result.one_or_none()
+            snooze_id = row.id if row is not None and not row.recurrence else None
+            # Строку, уже перенесённую восстановлением, повторно не двигаем
+            due = [row] if row is not None and row.remind_time <= now else []
+            remind_time = row.remind_time if due else None
+            self.components.outbox.add(session, [(chat_id, text, snooze_id, remind_time)])
+            if due:
+                self.components.lateness.observe((now - row.remind_time).total_seconds())
+            advanced = await self._advance_recurring(session, due, now)
+            await session.commit()
+        if advanced and not AppConfig.Scheduler.BATCH_MODE:
+            await asyncio.to_thread(self._register_jobs, advanced)
+        self.components.list_cache.invalidate(chat_id)
+        self.components.outbox.notify()
+
+    async def send_reminders(self, batch: List[Outgoing]):
+        """Постановка пачки напоминаний Outgoing в outbox одной транзакцией"""
+        async with self.components.async_session() as session:
+            self.components.outbox.add(session, batch)
+            await session.commit()
+        # В личных чатах chat_id совпадает с user_id, в группах запись
+        # истечёт сама по времени первого напоминания на странице
+        self.components.list_cache.invalidate(*{chat_id for chat_id, *_ in batch})
+        self.components.outbox.notify()
+
+    @staticmethod
+    def job_args(chat_id: int, text: str, job_id: str) -> tuple:
+        """Аргументы sync_tasks.send_reminder: job_id связывает срабатывание со строкой"""
+        return chat_id, text, job_id
+
+    async def snooze_reminder(self, reminder_id: int, chat_id: int,
+                              remind_time: datetime) -> Optional[ReminderModel]:
+        """
+        Перенос сработавшего разового напоминания на remind_time без новой
+        строки: то же id и job_id, задание перерегистрируется с заменой.
+        """
+        async with self.components.async_session() as session:
+            reminder = await session.get(ReminderModel, reminder_id)
+            if reminder is None or reminder.chat_id != chat_id or reminder.recurrence:
+                return None
+            reminder.remind_time = remind_time
+            await session.commit()
+
+        if not AppConfig.Scheduler.BATCH_MODE:
+            self.components.scheduler.add_job(
+                sync_tasks.send_reminder,
+                trigger=DateTrigger(remind_time),
+                args=self.job_args(reminder.chat_id, reminder.text, reminder.job_id),
+                id=reminder.job_id,
+                replace_existing=True
+            )
+        else:
+            self.components.timer.schedule(reminder)
+        self.components.list_cache.invalidate(reminder.user_id)
+        return reminder
+
+    async def _advance_recurring(self, session: AsyncSession, rows,
+                                 now: datetime) -> List[ReminderModel]:
+        """
+        Перенос повторяющихся напоминаний на срабатывание после now (местное
+        время без зоны) в транзакции вызывающего. Возвращает перенесённые
+        строки для регистрации заданий.
+        """
+        advanced = []
+        for row in rows:
+            if not row.recurrence:
+                continue
+            next_time = Recurrence.next_time(row.recurrence, row.remind_time, now)
+            if next_time is None:
+                continue
+            await session.execute(
+                update(ReminderModel)
+                .where(ReminderModel.id == row.id)
+                .where(ReminderModel.remind_time == row.remind_time)
+                .values(remind_time=next_time)
+            )
+            advanced.append(ReminderModel(
+                id=row.id, chat_id=row.chat_id, text=row.text, remind_time=next_time,
+                job_id=row.job_id, recurrence=row.recurrence
+            ))
+        return advanced
+
+    async def _advance_overdue(self, before: datetime):
+        """Повторяющиеся напоминания, пропущенные за время простоя, переносятся вперёд без отправки"""
+        now = datetime.now(AppConfig.Scheduler.TIMEZONE).replace(tzinfo=None)
+        async with self.components.async_session() as session:
+            result = await session.execute(
+                select(*self.SCHEDULE_COLUMNS)
+                .where(ReminderModel.remind_time <= before)
+                .where(ReminderModel.recurrence.is_not(None))
+            )
+            advanced = await self._advance_recurring(session, result.all(), now)
+            await session.commit()
+        if advanced:
+            logger.info(f"Moved {len(advanced)} missed recurring reminders to their next occurrence")
+
+    async def dispatch_due(self):
+        """Тик пакетного режима: отправка напоминаний, наступивших с прошлого тика"""
+        now = datetime.now(AppConfig.Scheduler.TIMEZONE)
+        async with self.components.async_session() as session:
+            result = await session.execute(
+                select(*self.SCHEDULE_COLUMNS)
+                .where(ReminderModel.remind_time > self.dispatched_until)
+                .where(ReminderModel.remind_time <= now)
+                .order_by(ReminderModel.remind_time)
+            )
+            await self._dispatch(session, result.all(), now)
+
+    async def prefetch_due(self):
+        """Тик упреждающей выборки: загрузка в таймер напоминаний следующих LOOKAHEAD секунд"""
+        timer = self.components.timer
+        until = timer.local_now() + timedelta(seconds=AppConfig.Scheduler.LOOKAHEAD)
+        read_from = timer.fired_until
+        # Окно перечитывается целиком от прошлой границы: так подхватываются
+        # и строки, вставленные другим процессом (import_reminders.py)
+        async with self.components.async_session() as session:
+            result = await session.execute(
+                select(*self.SCHEDULE_COLUMNS)
+                .where(ReminderModel.remind_time > timer.read_from)
+                .where(ReminderModel.remind_time <= until)
+            )
+            rows = result.all()
+        timer.load(rows, until, read_from)
+
+    async def fire_due(self, rows: List[TimerEntry], now: datetime):
+        """Срабатывание наступивших напоминаний таймера (now - местное время без зоны)"""
+        async with self.components.async_session() as session:
+            await self._dispatch(session, rows, AppConfig.Scheduler.TIMEZONE.localize(now))
+
+    async def _dispatch(self, session: AsyncSession, rows, now: datetime):
+        batch = [
+            (row.chat_id, row.text, None if row.recurrence else row.id, row.remind_time) for row in rows
+        ]
+        if batch:
+            # Граница, outbox и перенос повторяющихся фиксируются вместе:
+            # пачка не теряется и не дублируется
+            self.components.outbox.add(session, batch)
+            advanced = await self._advance_recurring(session, rows, now.replace(tzinfo=None))
+            await session.merge(SchedulerStateModel(key="dispatched_until", value=now))
+            await session.commit()
+        self.dispatched_until = now
+
+        if batch:
+            fired = datetime.now(AppConfig.Scheduler.TIMEZONE).replace(tzinfo=None)
+            for row in rows:
+                self.components.lateness.observe((fired - row.remind_time).total_seconds())
+            for row in advanced:
+                self.components.timer.schedule(row)
+            logger.info(f"Dispatching {len(batch)} due reminders")
+            self.components.list_cache.invalidate(*{chat_id for chat_id, *_ in batch})
+            self.components.outbox.notify()
+
+    async def restore_reminders(self):
+        """Восстановление напоминаний при старте"""
+        if AppConfig.Scheduler.BATCH_MODE:
+            # Продолжаем с сохранённой границы, но не глубже misfire_grace_time
+            now = datetime.now(AppConfig.Scheduler.TIMEZONE)
+            async with self.components.async_session() as session:
+                state = await session.get(SchedulerStateModel, "dispatched_until")
+            self.dispatched_until = now
+            if state:
+                grace = timedelta(seconds=AppConfig.Scheduler.JOB_DEFAULTS['misfire_grace_time'])
+                self.dispatched_until = max(
+                    AppConfig.Scheduler.TIMEZONE.localize(state.value), now - grace
+                )
+            await self._advance_overdue(self.dispatched_until)
+            tick = self.dispatch_due
+            if AppConfig.Scheduler.PREFETCH:
+                tick = self.prefetch_due
+                self.components.timer.start(self.fire_due, self.dispatched_until)
+                await self.prefetch_due()
+            self.components.scheduler.add_job(
+                tick,
+                trigger=IntervalTrigger(seconds=AppConfig.Scheduler.TICK_INTERVAL),
+                id="dispatch_tick",
+                jobstore="memory",
+                max_instances=1,
+                coalesce=True,
+                replace_existing=True
+            )
+            return
+
+        # В режиме сверки задания, уже сохранённые в jobstore с тем же временем
+        # срабатывания, не трогаются; иначе jobstore напоминаний пересобирается с нуля,
+        # служебные задания в "memory" остаются
+        reconcile = AppConfig.Scheduler.RECONCILE_ON_START
+        if not reconcile:
+            self.components.scheduler.remove_all_jobs(jobstore='default')
+
+        # Порции выбираются по курсору (remind_time, id) по индексу remind_time:
+        # ближайшие напоминания регистрируются первыми, а память ограничена
+        # размером порции - и для напоминаний, и для заданий jobstore
+        now = datetime.now(AppConfig.Scheduler.TIMEZONE)
+        started = time.monotonic()
+        await self._advance_overdue(now)
+        registered = unchanged = 0
+        cursor = None
+
+        while True:
+            query = (
+                select(*self.SCHEDULE_COLUMNS)
+                .where(ReminderModel.remind_time > now)
+                .order_by(ReminderModel.remind_time, ReminderModel.id)
+                .limit(AppConfig.Scheduler.RESTORE_CHUNK)
+            )
+            if cursor:
+                query = query.where(or_(
+                    ReminderModel.remind_time > cursor[0],
+                    and_(ReminderModel.remind_time == cursor[0], ReminderModel.id > cursor[1])
+                ))
+
+            async with self.components.async_session() as session:
+                rows = (await session.execute(query)).all()
+            if not rows:
+                break
+            cursor = (rows[-1].remind_time, rows[-1].id)
+
+            stored = {}
+            if reconcile:
+                stored = await asyncio.to_thread(self._stored_jobs, [row.job_id for row in rows])
+            changed = [
+                row for row in rows
+                if stored.get(row.job_id) != datetime_to_utc_timestamp(
+                    AppConfig.Scheduler.TIMEZONE.localize(row.remind_time))
+            ]
+            unchanged += len(rows) - len(changed)
+            if not changed:
+                continue
+
+            try:
+                await asyncio.to_thread(self._register_jobs, changed)
+                registered += len(changed)
+            except Exception as e:
+                logger.error(f"Ошибка восстановления порции до {cursor}: {e}")
+            logger.debug(f"Восстановлено напоминаний: {registered + unchanged}")
+
+        removed = await self._remove_orphan_jobs(now) if reconcile else 0
+
+        logger.info(
+            f"Восстановление за {time.monotonic() - started:.1f} с: "
+            f"зарегистрировано {registered}, без изменений {unchanged}, удалено {removed}"
+        )
+
+    async def _remove_orphan_jobs(self, now: datetime) -> int:
+        """Удаление заданий jobstore без будущего напоминания: проход порциями по id"""
+        removed = 0
+        after = ""
+        while True:
+            job_ids = await asyncio.to_thread(self._stored_job_ids, after)
+            if not job_ids:
+                return removed
+            after = job_ids[-1]
+
+            async with self.components.async_session() as session:
+                live = set((await session.scalars(
+                    select(ReminderModel.job_id)
+                    .where(ReminderModel.job_id.in_(job_ids), ReminderModel.remind_time > now)
+                )).all())
+            orphans = [job_id for job_id in job_ids if job_id not in live]
+            if orphans:
+                await asyncio.to_thread(self._remove_jobs, orphans)
+                removed += len(orphans)
+
+    def _stored_jobs(self, job_ids: List[str]) -> Dict[str, float]:
+        """Задания jobstore из списка: job_id -> время срабатывания (UTC timestamp)"""
+        jobstore = AppConfig.Scheduler.JOBSTORES['default']
+        if isinstance(jobstore, SQLAlchemyJobStore):
+            with jobstore.engine.connect() as connection:
+                result = connection.execute(
+                    select(jobstore.jobs_t.c.id, jobstore.jobs_t.c.next_run_time)
+                    .where(jobstore.jobs_t.c.id.in_(job_ids))
+                )
+                return dict(result.all())
+        jobs = (self.components.scheduler.get_job(job_id, jobstore='default') for job_id in job_ids)
+        return {job.id: datetime_to_utc_timestamp(job.next_run_time) for job in jobs if job}
+
+    def _stored_job_ids(self, after: str) -> List[str]:
+        """Следующая порция id заданий jobstore по возрастанию, начиная после after"""
+        jobstore = AppConfig.Scheduler.JOBSTORES['default']
+        chunk = AppConfig.Scheduler.RESTORE_CHUNK
+        if isinstance(jobstore, SQLAlchemyJobStore):
+            with jobstore.engine.connect() as connection:
+                return list(connection.scalars(
+                    select(jobstore.jobs_t.c.id)
+                    .where(jobstore.jobs_t.c.id > after)
+                    .order_by(jobstore.jobs_t.c.id)
+                    .limit(chunk)
+                ))
+        job_ids = sorted(
+            job.id for job in self.components.scheduler.get_jobs(jobstore='default') if job.id > after
+        )
+        return job_ids[:chunk]
+
+    def _remove_jobs(self, job_ids: List[str]):
+        """Удаление заданий из jobstore порциями"""
+        jobstore = AppConfig.Scheduler.JOBSTORES['default']
+        chunk = AppConfig.Scheduler.RESTORE_CHUNK
+        if isinstance(jobstore, SQLAlchemyJobStore):
+            with jobstore.engine.begin() as connection:
+                for start in range(0, len(job_ids), chunk):
+                    connection.execute(
+                        jobstore.jobs_t.delete()
+                        .where(jobstore.jobs_t.c.id.in_(job_ids[start:start + chunk]))
                     )
-                    logger.info(f"Восстановлено напоминание: {reminder.id}")
-                except Exception as e:
-                    logger.error(f"Ошибка восстановления {reminder.id}: {e}")
+            return
+        for job_id in job_ids:
+            self.components.scheduler.remove_job(job_id, jobstore='default')
+
+    def _register_jobs(self, rows):
+        """Регистрация порции заданий одной транзакцией в jobstore (с заменой существующих)"""
+        scheduler = self.components.scheduler
+        jobs = [self._build_job(row.job_id, row.chat_id, row.text, row.remind_time) for row in rows]
+
+        jobstore = AppConfig.Scheduler.JOBSTORES['default']
+        if isinstance(jobstore, SQLAlchemyJobStore):
+            try:
+                with jobstore.engine.begin() as connection:
+                    connection.execute(
+                        jobstore.jobs_t.delete()
+                        .where(jobstore.jobs_t.c.id.in_([job.id for job in jobs]))
+                    )
+                    connection.execute(jobstore.jobs_t.insert(), [
+                        {
+                            "id": job.id,
+                            "next_run_time": datetime_to_utc_timestamp(job.next_run_time),
+                            "job_state": pickle.dumps(job.__getstate__(), jobstore.pickle_protocol),
+                        }
+                        for job in jobs
+                    ])
+                scheduler.wakeup()
+                return
+            except IntegrityError:
+                # Конфликт с заданием, созданным во время восстановления
+                pass
+
+        for job in jobs:
+            scheduler.add_job(
+                job.func, trigger=job.trigger, args=job.args, id=job.id,
+                replace_existing=True
+            )
+
+    def _build_job(self, job_id: str, chat_id: int, text: str, remind_time: datetime) -> Job:
+        """Задание отправки напоминания с параметрами планировщика по умолчанию"""
+        trigger = DateTrigger(remind_time, timezone=AppConfig.Scheduler.TIMEZONE)
+        return Job(
+            self.components.scheduler,
+            id=job_id,
+            func=sync_tasks.send_reminder,
+            trigger=trigger,
+            executor="default",
+            args=self.job_args(chat_id, text, job_id),
+            kwargs={},
+            misfire_grace_time=AppConfig.Scheduler.JOB_DEFAULTS['misfire_grace_time'],
+            coalesce=AppConfig.Scheduler.JOB_DEFAULTS['coalesce'],
+            max_instances=1,
+            next_run_time=trigger.run_date
+        )
+
+
+## Повторяющиеся напоминания
+class Recurrence:
+    """
+    Правила повтора, хранятся строкой в ReminderModel.recurrence: "daily",
+    "weekly", "weekdays", "every:<N>h" и "cron:<мин> <час> <день> <месяц> <день недели>".
+
+    В строке хранится только правило и ближайшее срабатывание, следующее
+    вычисляется после отправки. Время - местное время зоны бота без зоны,
+    как в таблице reminders.
+    """
+
+    STEPS = {"daily": timedelta(days=1), "weekly": timedelta(weeks=1), "weekdays": timedelta(days=1)}
+    EVERY = re.compile(r"every:(\d{1,4})h")
+    CRON_WEEKDAY = re.compile(r"(\*|(\d)(?:-(\d))?)(?:/(\d+))?")  # *, N, N-M и шаг /K
+    DESCRIPTIONS = {"daily": "каждый день", "weekly": "каждую неделю", "weekdays": "по будням"}
+    WEEKDAYS = ("sun", "mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+    @staticmethod
+    def validate(rule: str):
+        if Recurrence._step(rule) is None and Recurrence._cron(rule) is None:
+            raise ValueError(f"Unknown recurrence rule: {rule}")
+
+    @staticmethod
+    def describe(rule: str) -> str:
+        if rule in Recurrence.DESCRIPTIONS:
+            return Recurrence.DESCRIPTIONS[rule]
+        if rule.startswith("cron:"):
+            return f"по расписанию {rule[5:]}"
+        hours = int(Recurrence.EVERY.fullmatch(rule).group(1))
+        return "каждый час" if hours == 1 else f"каждые {hours} ч"
+
+    @staticmethod
+    def next_time(rule: str, previous: datetime, now: datetime) -> Optional[datetime]:
+        """Срабатывание, следующее за previous и позже now"""
+        if Recurrence._cron(rule) is not None:
+            return Recurrence.align(rule, previous + timedelta(minutes=1), now)
+        return Recurrence.align(rule, previous + Recurrence._step(rule), now)
+
+    @staticmethod
+    def align(rule: str, anchor: datetime, now: datetime) -> Optional[datetime]:
+        """Первое срабатывание не раньше anchor и позже now"""
+        trigger = Recurrence._cron(rule)
+        if trigger is not None:
+            start = max(anchor, now.replace(microsecond=0) + timedelta(seconds=1))
+            tz = AppConfig.Scheduler.TIMEZONE
+            fire_time = trigger.get_next_fire_time(None, tz.localize(start))
+            return fire_time.astimezone(tz).replace(tzinfo=None) if fire_time else None
+
+        step = Recurrence._step(rule)
+        if anchor <= now:
+            anchor += step * ((now - anchor) // step + 1)
+        if rule == "weekdays":
+            while anchor.weekday() >= 5:
+                anchor += step
+        return anchor
+
+    @staticmethod
+    def _step(rule: str) -> Optional[timedelta]:
+        step = Recurrence.STEPS.get(rule)
+        if step is None:
+            match = Recurrence.EVERY.fullmatch(rule)
+            if match and int(match.group(1)) > 0:
+                step = timedelta(hours=int(match.group(1)))
+        return step
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _cron(rule: str) -> Optional[CronTrigger]:
+        fields = rule[5:].split()
+        if not rule.startswith("cron:") or len(fields) != 5:
+            return None
+        day_of_week = Recurrence._cron_weekdays(fields[4])
+        if day_of_week is None:
+            return None
+        minute, hour, day, month = fields[:4]
+        try:
+            return CronTrigger(minute=minute, hour=hour, day=day, month=month,
+                               day_of_week=day_of_week, timezone=AppConfig.Scheduler.TIMEZONE)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _cron_weekdays(field: str) -> Optional[str]:
+        """
+        День недели crontab для CronTrigger: в crontab 0 и 7 - воскресенье,
+        а APScheduler считает с понедельника и не понимает диапазонов через
+        воскресенье ("0-4"), поэтому числовые элементы раскрываются в имена.
+        """
+        if field == "*":
+            return field
+        days = []
+        for item in field.split(","):
+            match = Recurrence.CRON_WEEKDAY.fullmatch(item)
+            if not match:
+                days.append(item)  # имена ("mon-fri") APScheduler разбирает сам
+                continue
+            star, first, last, step = match.groups()
+            start, end = (0, 6) if star == "*" else (int(first), int(last or first))
+            step = int(step or 1)
+            if start > end or end > 7 or step < 1:
+                return None
+            days.extend(Recurrence.WEEKDAYS[number] for number in range(start, end + 1, step))
+        return ",".join(dict.fromkeys(days))
 
 
 ## Парсер времени
+Schedule = Tuple[datetime, Optional[str]]  # первое срабатывание и правило повтора
+Token = Tuple[str, object, int]  # (вид, значение, конец во входной строке)
+
+
 class TimeInputParser:
+    """
+    Разбор ввода времени за один проход: токенизатор на одном регулярном
+    выражении и разбор списка токенов по таблицам слов.
+
+    Поддерживаемые формы:
+    - "через 1 час 30 минут", "через полчаса", "in 2 days", "через 1ч 30м";
+    - "[сегодня|завтра|послезавтра] [в 9[:30]]", "tomorrow at 9";
+    - "в пятницу в 9", "on monday at 10:00";
+    - "15 марта [2027] [в 10:00]", "ДД.ММ[.ГГГГ] [ЧЧ:ММ]", "[в] ЧЧ:ММ", "в 9";
+    - повторы: "каждый день в 9", "по будням в 8:30", "каждую пятницу в 18:00",
+      "каждые 2 часа", "every 2 days at 10", "cron 0 9 * * 1-5".
+
+    День без времени означает DEFAULT_TIME. День недели и дата без года
+    переносятся вперёд, если уже прошли.
+    """
+
+    CRON = re.compile(r"\s*cron\s+((?:\S+\s+){4}\S+)(?:\s+(.*))?", re.IGNORECASE | re.DOTALL)
+    TOKEN = re.compile(
+        r"(?P<time>\d{1,2}:\d{2})"
+        r"|(?P<date>\d{1,2}\.\d{1,2}(?:\.\d{4})?)"
+        r"|(?P<num>\d{1,4})"
+        r"|(?P<word>[^\W\d_]+)"
+        r"|(?P<junk>\S)"
+    )
+
+    # Слова, распознаваемые только целиком
+    WORDS = {
+        "через": ("rel", None), "in": ("rel", None),
+        "в": ("at", None), "во": ("at", None), "по": ("at", None),
+        "at": ("at", None), "on": ("at", None),
+        "every": ("every", None), "ежедневно": ("every", "days"), "daily": ("every", "days"),
+        "ежечасно": ("every", "hours"), "hourly": ("every", "hours"),
+        "еженедельно": ("every", "weeks"), "weekly": ("every", "weeks"),
+        "и": ("and", None), "and": ("and", None),
+        "сегодня": ("day", 0), "today": ("day", 0),
+        "завтра": ("day", 1), "tomorrow": ("day", 1), "послезавтра": ("day", 2),
+        "полчаса": ("span", timedelta(minutes=30)),
+        "м": ("unit", "minutes"), "m": ("unit", "minutes"),
+        "ч": ("unit", "hours"), "h": ("unit", "hours"),
+        "д": ("unit", "days"), "d": ("unit", "days"),
+    }
+    # Основы слов: покрывают падежные формы и английские варианты
+    STEMS = {
+        "мин": ("unit", "minutes"), "min": ("unit", "minutes"),
+        "час": ("unit", "hours"), "hour": ("unit", "hours"), "hr": ("unit", "hours"),
+        "дн": ("unit", "days"), "ден": ("unit", "days"), "сут": ("unit", "days"),
+        "day": ("unit", "days"),
+        "нед": ("unit", "weeks"), "week": ("unit", "weeks"),
+        "кажд": ("every", None), "будн": ("weekdays", None), "weekday": ("weekdays", None),
+    }
+    # Дни недели и месяцы - только в своих формах, иначе по основе "марафон"
+    # стал бы мартом, а "wedding" средой
+    WEEKDAY_FORMS = (
+        ("понедельник", "понедельникам", "пн", "monday", "mondays", "mon"),
+        ("вторник", "вторникам", "вт", "tuesday", "tuesdays", "tue", "tues"),
+        ("среда", "среду", "средам", "ср", "wednesday", "wednesdays", "wed"),
+        ("четверг", "четвергам", "чт", "thursday", "thursdays", "thu", "thur", "thurs"),
+        ("пятница", "пятницу", "пятницам", "пт", "friday", "fridays", "fri"),
+        ("суббота", "субботу", "субботам", "сб", "saturday", "saturdays", "sat"),
+        ("воскресенье", "воскресеньям", "вс", "sunday", "sundays", "sun"),
+    )
+    MONTH_FORMS = (
+        ("января", "январь", "янв", "january", "jan"),
+        ("февраля", "февраль", "фев", "february", "feb"),
+        ("марта", "март", "мар", "march", "mar"),
+        ("апреля", "апрель", "апр", "april", "apr"),
+        ("мая", "май", "may"),
+        ("июня", "июнь", "июн", "june", "jun"),
+        ("июля", "июль", "июл", "july", "jul"),
+        ("августа", "август", "авг", "august", "aug"),
+        ("сентября", "сентябрь", "сен", "сент", "september", "sep", "sept"),
+        ("октября", "октябрь", "окт", "october", "oct"),
+        ("ноября", "ноябрь", "ноя", "november", "nov"),
+        ("декабря", "декабрь", "дек", "december", "dec"),
+    )
+    WORDS.update(
+        {form: ("weekday", day) for day, forms in enumerate(WEEKDAY_FORMS) for form in forms}
+    )
+    WORDS.update(
+        {form: ("month", month) for month, forms in enumerate(MONTH_FORMS, 1) for form in forms}
+    )
+    STEM_SIZES = sorted({len(stem) for stem in STEMS}, reverse=True)
+    # Частые формы для _parse_quick
+    QUICK_RELATIVE = re.compile(r"\s*(?:через|in)\s+(\d{1,4})\s*([^\W\d_]+)\s*", re.IGNORECASE)
+    QUICK_CLOCK = re.compile(
+        r"\s*(?:([^\W\d_]+)\s+)?(?:(?:в|at)\s+)?(\d{1,2}):(\d{2})\s*", re.IGNORECASE)
+    DEFAULT_TIME = (9, 0)
+    MAX_PREFIX_TOKENS = 8  # самое длинное выражение времени в начале команды
+
     @staticmethod
     def parse(input_str: str) -> Optional[datetime]:
-        """Парсинг пользовательского ввода времени"""
-        input_str = input_str.lower().strip()
-        now = datetime.now(AppConfig.Scheduler.TIMEZONE)
+        """Парсинг пользовательского ввода времени (для повторов - первое срабатывание)"""
+        schedule = TimeInputParser.parse_schedule(input_str)
+        return schedule[0] if schedule else None
 
-        try:
-            if input_str.startswith("через"):
-                return TimeInputParser._parse_relative(input_str, now)
-            elif "в " in input_str:
-                return TimeInputParser._parse_absolute(input_str, now)
-            return TimeInputParser._parse_datetime(input_str, now)
-        except (ValueError, IndexError):
+    @staticmethod
+    def parse_schedule(input_str: str) -> Optional[Schedule]:
+        """Время и правило повтора (None для разового напоминания)"""
+        now = datetime.now(AppConfig.Scheduler.TIMEZONE)
+        remind_time = TimeInputParser._parse_quick(input_str, now)
+        if remind_time:
+            return remind_time, None
+        cron = TimeInputParser.CRON.fullmatch(input_str)
+        if cron:
+            return None if cron.group(2) else TimeInputParser._parse_cron(cron.group(1), now)
+        tokens = TimeInputParser.tokenize(input_str)
+        if not tokens:
             return None
+        return TimeInputParser._parse_tokens(tokens, now)
 
     @staticmethod
-    def _parse_relative(text: str, now: datetime) -> datetime:
-        parts = text.split()
-        num = int(parts[1])
-        unit = parts[2]
+    def split(input_str: str) -> Optional[Tuple[datetime, Optional[str], str]]:
+        """
+        Выделение времени в начале строки: "через 30 минут купить молоко" ->
+        (время, правило повтора, "купить молоко"). Берётся самый длинный
+        разбираемый префикс, после которого остаётся текст; если текст не
+        остаётся ни после одного, то самый длинный с пустым текстом.
+        """
+        now = datetime.now(AppConfig.Scheduler.TIMEZONE)
+        remind_time = TimeInputParser._parse_quick(input_str, now)
+        if remind_time:
+            return remind_time, None
+        cron = TimeInputParser.CRON.fullmatch(input_str)
+        if cron:
+            schedule = TimeInputParser._parse_cron(cron.group(1), now)
+            return schedule and (*schedule, (cron.group(2) or "").strip())
+
+        tokens = TimeInputParser.tokenize(input_str, TimeInputParser.MAX_PREFIX_TOKENS)
+        fallback = None
+        for size in range(len(tokens), 0, -1):
+            if tokens[size - 1][0] in ("rel", "at", "and", "every"):
+                continue
+            schedule = TimeInputParser._parse_tokens(tokens[:size], now)
+            if schedule is None:
+                continue
+            text = input_str[tokens[size - 1][2]:].strip()
+            # Остаток из одних слов времени ("в 9 мая") текстом не считается
+            if text and (
+                len(tokens) == TimeInputParser.MAX_PREFIX_TOKENS
+                or any(kind in ("word", "junk") for kind, _, _ in tokens[size:])
+            ):
+                return (*schedule, text)
+            fallback = fallback or (*schedule, text)
+        return fallback
 
-        if any(x in unit for x in ["мин", "min"]):
-            delta = timedelta(minutes=num)
-        elif any(x in unit for x in ["час", "hour"]):
-            delta = timedelta(hours=num)
-        elif any(x in unit for x in ["день", "ден", "day"]):
-            delta = timedelta(days=num)
+    @staticmethod
+    def _parse_quick(input_str: str, now: datetime) -> Optional[datetime]:
+        """
+        Частые формы без токенизатора: "через N <единица>" и "[завтра] [в] ЧЧ:ММ".
+        None - разбор общим путём (он же отвечает и за ошибки)
+        """
+        match = TimeInputParser.QUICK_RELATIVE.fullmatch(input_str)
+        if match:
+            kind, unit = TimeInputParser._lookup(match.group(2).lower())
+            return now + timedelta(**{unit: int(match.group(1))}) if kind == "unit" else None
+        match = TimeInputParser.QUICK_CLOCK.fullmatch(input_str)
+        if match:
+            word = match.group(1)
+            kind, offset = TimeInputParser._lookup(word.lower()) if word else ("at", 0)
+            if kind not in ("at", "day"):
+                return None
+            day = now + timedelta(days=offset) if offset else now
+            return TimeInputParser._combine(
+                now, day.year, day.month, day.day, int(match.group(2)), int(match.group(3)))
+        return None
+
+    @staticmethod
+    def _parse_tokens(tokens: List[Token], now: datetime) -> Optional[Schedule]:
+        head = next((kind for kind, _, _ in tokens if kind != "at"), None)
+        if head in ("every", "weekdays"):
+            return TimeInputParser._parse_recurring(tokens, now)
+        if tokens[0][0] == "rel":
+            remind_time = TimeInputParser._parse_relative(tokens, now)
         else:
-            raise ValueError("Unknown time unit")
+            remind_time = TimeInputParser._parse_absolute(tokens, now)
+        return (remind_time, None) if remind_time else None
 
-        return now + delta
+    @staticmethod
+    def _parse_cron(expression: str, now: datetime) -> Optional[Schedule]:
+        rule = "cron:" + " ".join(expression.split())
+        if len(rule) > ReminderModel.recurrence.type.length or Recurrence._cron(rule) is None:
+            return None
+        naive_now = now.replace(tzinfo=None)
+        first = Recurrence.align(rule, naive_now, naive_now)
+        return (AppConfig.Scheduler.TIMEZONE.localize(first), rule) if first else None
 
     @staticmethod
-    def _parse_absolute(text: str, now: datetime) -> datetime:
-        if "завтра" in text:
-            date = now.date() + timedelta(days=1)
-            time_part = text.split("в ")[1]
+    def _parse_recurring(tokens: List[Token], now: datetime) -> Optional[Schedule]:
+        """Повторы: "каждый день в 9", "по будням", "каждую пятницу в 18", "каждые 2 часа" и т.п."""
+        every, implied, i = False, None, 0
+        # "по"/"в" перед словом повтора; после него "в" относится уже ко времени
+        while i < len(tokens) and (tokens[i][0] == "every" or tokens[i][0] == "at" and not every):
+            if tokens[i][0] == "every":
+                every, implied = True, tokens[i][1] or implied
+            i += 1
+        head = tokens[i:]
+
+        amount, unit, rest = 1, implied, head
+        if implied:
+            pass
+        elif head and head[0][0] == "weekdays":
+            unit, rest = "weekdays", head[1:]
+        elif every and head and head[0][0] == "weekday":
+            unit = "weekly"
+        elif every and len(head) > 1 and head[0][0] == "num" and head[1][0] == "unit":
+            amount, unit, rest = head[0][1], head[1][1], head[2:]
+        elif every and head and head[0][0] == "unit":
+            unit, rest = head[0][1], head[1:]
+
+        if amount < 1 or unit is None or unit == "minutes":
+            return None
+        if unit == "hours":
+            # Интервал в часах отсчитывается от текущего момента
+            return (now + timedelta(hours=amount), f"every:{amount}h") if not rest else None
+        if unit in ("weekdays", "weekly"):
+            rule = unit
+        elif unit == "days":
+            rule = "daily" if amount == 1 else f"every:{24 * amount}h"
         else:
-            date = now.date()
-            time_part = text.split("в ")[1] if "в " in text else text
-
-        if ":" in time_part:
-            hours, minutes = map(int, time_part.split(":"))
+            rule = "weekly" if amount == 1 else f"every:{168 * amount}h"
+        if Recurrence._step(rule) is None:
+            return None  # интервал длиннее, чем помещается в правило every:<N>h
+
+        # Остаток - только время суток (и день недели для еженедельного)
+        allowed = ("at", "time", "num")
+        if unit in ("weekly", "weeks"):
+            allowed += ("weekday",)
+        if any(kind not in allowed for kind, _, _ in rest):
+            return None
+        if any(kind != "at" for kind, _, _ in rest):
+            first = TimeInputParser._parse_absolute(rest, now)
         else:
-            hours, minutes = int(time_part), 0
+            first = TimeInputParser._combine(
+                now, now.year, now.month, now.day, *TimeInputParser.DEFAULT_TIME)
+        if first is None:
+            return None
 
-        return datetime.combine(date, datetime.min.time()).replace(
-            hour=hours, minute=minutes, tzinfo=AppConfig.Scheduler.TIMEZONE)
+        naive = first.replace(tzinfo=None)
+        aligned = Recurrence.align(rule, naive, now.replace(tzinfo=None))
+        if aligned != naive:
+            first = TimeInputParser._combine(
+                now, aligned.year, aligned.month, aligned.day, aligned.hour, aligned.minute)
+        return first, rule
 
     @staticmethod
-    def _parse_datetime(text: str, now: datetime) -> datetime:
-        for fmt in ("%d.%m.%Y %H:%M", "%d.%m %H:%M", "%H:%M"):
-            try:
-                dt = datetime.strptime(text, fmt)
-                if fmt == "%H:%M":
-                    return datetime.combine(now.date(), dt.time()).replace(
-                        tzinfo=AppConfig.Scheduler.TIMEZONE)
-                return dt.replace(tzinfo=AppConfig.Scheduler.TIMEZONE)
-            except ValueError:
+    def tokenize(text: str, limit: Optional[int] = None) -> List[Token]:
+        tokens = []
+        for match in islice(TimeInputParser.TOKEN.finditer(text), limit):
+            kind, raw = match.lastgroup, match.group().lower()
+            if kind == "time":
+                hours, minutes = raw.split(":")
+                value = (int(hours), int(minutes))
+            elif kind == "date":
+                parts = raw.split(".")
+                value = (int(parts[0]), int(parts[1]), int(parts[2]) if len(parts) > 2 else None)
+            elif kind == "num":
+                value = int(raw)
+            elif kind == "word":
+                kind, value = TimeInputParser._lookup(raw)
+            else:
+                value = raw
+            tokens.append((kind, value, match.end()))
+        return tokens
+
+    @staticmethod
+    def _lookup(word: str) -> Tuple[str, object]:
+        """Вид слова: сначала целиком, затем по основе не длиннее STEM_SIZES"""
+        known = TimeInputParser.WORDS.get(word)
+        if known:
+            return known
+        for size in TimeInputParser.STEM_SIZES:
+            known = TimeInputParser.STEMS.get(word[:size])
+            if known:
+                return known
+        return "word", word
+
+    @staticmethod
+    def _parse_relative(tokens: List[Token], now: datetime) -> Optional[datetime]:
+        delta = timedelta()
+        parts = 0
+        i = 1
+        while i < len(tokens):
+            kind, value, _ = tokens[i]
+            if kind == "and" and parts:
+                i += 1
                 continue
-        raise ValueError("Invalid datetime format")
+            amount = None
+            if kind == "num" and i + 1 < len(tokens) and tokens[i + 1][0] == "unit":
+                amount = value
+                i += 1
+                kind, value, _ = tokens[i]
+            # Единица без числа ("через час") допустима только первой, иначе
+            # "через 5 минут минералку" разобралось бы как ещё одна минута
+            if kind == "unit" and (amount is not None or not parts):
+                delta += timedelta(**{value: 1 if amount is None else amount})
+            elif kind == "span":
+                delta += value
+            else:
+                return None
+            parts += 1
+            i += 1
+        if not parts:
+            return None
+        try:
+            return now + delta
+        except OverflowError:
+            return None
+
+    @staticmethod
+    def _parse_absolute(tokens: List[Token], now: datetime) -> Optional[datetime]:
+        offset = weekday = date = clock = None
+        i = 0
+        while i < len(tokens):
+            kind, value, _ = tokens[i]
+            dated = offset is not None or weekday is not None or date is not None
+            if kind == "at":
+                pass
+            elif kind == "day" and not dated:
+                offset = value
+            elif kind == "weekday" and not dated:
+                weekday = value
+            elif kind == "date" and not dated:
+                date = value
+            elif kind == "num" and not dated and i + 1 < len(tokens) and tokens[i + 1][0] == "month":
+                month, year = tokens[i + 1][1], None
+                i += 1
+                if i + 1 < len(tokens) and tokens[i + 1][0] == "num" and tokens[i + 1][1] >= 1000:
+                    year = tokens[i + 1][1]
+                    i += 1
+                date = (value, month, year)
+            elif kind == "time" and clock is None:
+                clock = value
+            elif kind == "num" and clock is None and i and tokens[i - 1][0] == "at":
+                clock = (value, 0)
+            else:
+                return None
+            i += 1
+
+        if clock is None and offset is None and weekday is None and date is None:
+            return None
+        hour, minute = clock or TimeInputParser.DEFAULT_TIME
+        combine = TimeInputParser._combine
+
+        if date is not None:
+            day, month, year = date
+            result = combine(now, year or now.year, month, day, hour, minute)
+            if year is None and result is not None and result <= now:
+                result = combine(now, now.year + 1, month, day, hour, minute)
+            return result
+
+        day = now.date() + timedelta(days=offset or 0)
+        if weekday is not None:
+            day = now.date() + timedelta(days=(weekday - now.weekday()) % 7)
+        result = combine(now, day.year, day.month, day.day, hour, minute)
+        if weekday is not None and result is not None and result <= now:
+            day += timedelta(days=7)
+            result = combine(now, day.year, day.month, day.day, hour, minute)
+        return result
+
+    @staticmethod
+    def _combine(now: datetime, year, month, day, hour, minute) -> Optional[datetime]:
+        """Проверка диапазонов без исключений и привязка к зоне бота"""
+        # Крайние годы отброшены: сдвиг на смещение зоны вышел бы за пределы datetime
+        if not (1 < year < 9999 and 1 <= month <= 12 and 1 <= day <= 31 and hour < 24 and minute < 60):
+            return None
+        if day > 28 and day > monthrange(year, month)[1]:
+            return None
+        tz = AppConfig.Scheduler.TIMEZONE
+        naive = datetime(year, month, day, hour, minute)
+        fixed_since, fixed_zone = TimeInputParser._fixed_zone(tz)
+        if naive >= fixed_since:
+            return naive.replace(tzinfo=fixed_zone)
+        # Обычно смещение зоны то же, что сейчас: fromutc - один bisect против
+        # перебора вариантов в localize, который нужен только на переходах
+        local = tz.fromutc((naive - now.utcoffset()).replace(tzinfo=tz))
+        if local.replace(tzinfo=None) != naive:
+            local = tz.localize(naive)
+        return local
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _fixed_zone(tz: tzinfo) -> Tuple[datetime, tzinfo]:
+        """
+        Местное время, после которого у зоны больше нет переходов, и её tzinfo
+        на этот период (для Москвы - с 2014 года, для зон с переходами - после 2037)
+        """
+        transitions = getattr(tz, "_utc_transition_times", None)
+        if not transitions:
+            return datetime.min, tz
+        # Сутки запаса покрывают разницу между UTC перехода и местным временем
+        since = transitions[-1] + timedelta(days=1)
+        return since, tz.localize(since).tzinfo
 
 
 ## Пользовательский интерфейс
 class BotUI:
+    # Кнопки "отложить": callback_data -> (надпись, выражение для TimeInputParser)
+    SNOOZE_OPTIONS = {
+        "10m": ("10 мин", "через 10 минут"),
+        "1h": ("1 час", "через 1 час"),
+        "tmrw": ("Завтра", "завтра"),
+    }
+
     @staticmethod
     def main_menu() -> InlineKeyboardMarkup:
         """Главное меню бота"""
@@ -315,16 +2484,114 @@ class BotUI:
         return markup
 
     @staticmethod
-    def reminders_list(reminders: List[ReminderModel]) -> InlineKeyboardMarkup:
-        """Список напоминаний с кнопками удаления"""
+    def reminders_text(page: ReminderPage) -> str:
+        """Текст страницы списка напоминаний"""
+        lines = ["📋 Ваши активные напоминания:", ""]
+        for reminder in page.reminders:
+            text = reminder.text
+            if len(text) > AppConfig.Bot.LIST_TEXT_LIMIT:
+                text = text[:AppConfig.Bot.LIST_TEXT_LIMIT] + "…"
+            line = f"• {text} - {reminder.remind_time.strftime('%d.%m.%Y %H:%M')}"
+            if reminder.recurrence:
+                line += f" 🔁 {Recurrence.describe(reminder.recurrence)}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    @staticmethod
+    def reminders_list(page: ReminderPage) -> InlineKeyboardMarkup:
+        """Список напоминаний с кнопками удаления и навигации по страницам"""
         markup = InlineKeyboardMarkup()
-        for reminder in reminders:
+        for reminder in page.reminders:
             btn_text = f"{reminder.text[:15]}... - {reminder.remind_time.strftime('%d.%m %H:%M')}"
+            if reminder.recurrence:
+                btn_text = "🔁 " + btn_text
             markup.add(InlineKeyboardButton(
                 btn_text, callback_data=f"delete_{reminder.id}"
             ))
+
+        navigation = []
+        if page.has_prev:
+            navigation.append(InlineKeyboardButton(
+                "« Назад", callback_data=f"list_p_{BotUI.encode_cursor(page.reminders[0])}"
+            ))
+        if page.has_next:
+            navigation.append(InlineKeyboardButton(
+                "Далее »", callback_data=f"list_n_{BotUI.encode_cursor(page.reminders[-1])}"
+            ))
+        if navigation:
+            markup.row(*navigation)
         return markup
 
+    DIGEST_HEADER = "⏰ Напоминания:"
+    DIGEST_HEADER_LENGTH = len(DIGEST_HEADER)
+
+    @staticmethod
+    def reminder_message(
+        items: List[Tuple[str, Optional[int]]]
+    ) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+        """
+        Текст и кнопки "отложить" доставки: одно напоминание или сводка
+        из пунктов (text, reminder_id), у повторяющихся reminder_id нет.
+        """
+        markup = InlineKeyboardMarkup()
+        if len(items) == 1:
+            text, reminder_id = items[0]
+            if reminder_id:
+                BotUI._add_snooze_row(markup, reminder_id, "💤 ")
+            return f"⏰ Напоминание: {text}", markup if reminder_id else None
+
+        lines = [BotUI.DIGEST_HEADER]
+        for number, (text, reminder_id) in enumerate(items, 1):
+            lines.append(f"{number}. {text}")
+            if reminder_id:
+                BotUI._add_snooze_row(markup, reminder_id, f"💤 {number}: ")
+        return "\n".join(lines), markup if markup.keyboard else None
+
+    @staticmethod
+    def digest_line_length(number: int, text: str) -> int:
+        return len(f"\n{number}. {text}")
+
+    @staticmethod
+    def _add_snooze_row(markup: InlineKeyboardMarkup, reminder_id: int, prefix: str):
+        markup.row(*(
+            InlineKeyboardButton(
+                (prefix if option == "10m" else "") + label,
+                callback_data=f"snooze_{reminder_id}_{option}"
+            )
+            for option, (label, _) in BotUI.SNOOZE_OPTIONS.items()
+        ))
+
+    @staticmethod
+    def without_snooze(
+        markup: Optional[InlineKeyboardMarkup], reminder_id: int
+    ) -> Optional[InlineKeyboardMarkup]:
+        """Клавиатура сообщения без кнопок отложенного напоминания"""
+        prefix = f"snooze_{reminder_id}_"
+        rows = [
+            row for row in (markup.keyboard if markup else [])
+            if not any((button.callback_data or "").startswith(prefix) for button in row)
+        ]
+        if not rows:
+            return None
+        return InlineKeyboardMarkup(rows)
+
+    @staticmethod
+    def reminder_created(remind_time: datetime, recurrence: Optional[str]) -> str:
+        text = f"✅ Напоминание создано на {remind_time.strftime('%d.%m.%Y %H:%M')}"
+        if recurrence:
+            text += f", повтор: {Recurrence.describe(recurrence)}"
+        return text
+
+    @staticmethod
+    def encode_cursor(reminder: ReminderModel) -> str:
+        """Курсор (remind_time, id) для callback_data (не длиннее 64 байт)"""
+        return f"{reminder.remind_time.strftime('%Y%m%d%H%M%S%f')}_{reminder.id}"
+
+    @staticmethod
+    def decode_cursor(value: str) -> Cursor:
+        remind_time, reminder_id = value.split("_")
+        return datetime.strptime(remind_time, "%Y%m%d%H%M%S%f"), int(reminder_id)
+
     @staticmethod
     def cancel_button() -> InlineKeyboardMarkup:
         """Кнопка отмены"""
@@ -348,6 +2615,15 @@ class BotHandlers:
         self.bot.register_message_handler(
             self.handle_start, commands=["start"], pass_bot=True
         )
+        self.bot.register_message_handler(
+            self.handle_remind_command, commands=["remind"], pass_bot=True
+        )
+        self.bot.register_inline_handler(
+            self.handle_inline_query, func=lambda query: True, pass_bot=True
+        )
+        self.bot.register_chosen_inline_handler(
+            self.handle_chosen_inline_result, func=lambda result: True, pass_bot=True
+        )
         self.bot.register_callback_query_handler(
             self.handle_create_reminder,
             func=lambda call: call.data == "create_reminder",
@@ -355,7 +2631,7 @@ class BotHandlers:
         )
         self.bot.register_callback_query_handler(
             self.handle_list_reminders,
-            func=lambda call: call.data == "list_reminders",
+            func=lambda call: call.data == "list_reminders" or call.data.startswith(("list_n_", "list_p_")),
             pass_bot=True
         )
         self.bot.register_callback_query_handler(
@@ -363,6 +2639,11 @@ class BotHandlers:
             func=lambda call: call.data.startswith("delete_"),
             pass_bot=True
         )
+        self.bot.register_callback_query_handler(
+            self.handle_snooze,
+            func=lambda call: call.data.startswith("snooze_"),
+            pass_bot=True
+        )
         self.bot.register_callback_query_handler(
             self.handle_cancel,
             func=lambda call: call.data == "cancel",
@@ -376,21 +2657,84 @@ class BotHandlers:
 
     async def handle_start(self, message: Message, bot: AsyncTeleBot):
         """Обработчик команды /start"""
-        self.components.user_contexts[message.from_user.id] = UserContext(
+        await self.components.user_contexts.set(message.from_user.id, UserContext(
             state=BotState.MAIN_MENU
-        )
+        ))
         await bot.send_message(
             message.chat.id,
             "Привет! Я бот для управления напоминаниями.",
             reply_markup=BotUI.main_menu()
         )
 
+    async def handle_remind_command(self, message: Message, bot: AsyncTeleBot):
+        """Создание напоминания одной командой: /remind через 30 минут купить молоко"""
+        parsed = TimeInputParser.split(extract_arguments(message.text) or "")
+        if parsed is None or not parsed[2]:
+            await bot.send_message(
+                message.chat.id,
+                "Использование: /remind <время> <текст>, например: "
+                "/remind через 30 минут купить молоко"
+            )
+            return
+
+        remind_time, recurrence, text = parsed
+        try:
+            await self.service.create_reminder(ReminderCreate(
+                user_id=message.from_user.id,
+                chat_id=message.chat.id,
+                text=text,
+                remind_time=remind_time,
+                recurrence=recurrence
+            ))
+        except ValueError as e:
+            await bot.send_message(message.chat.id, f"Ошибка: {str(e)}")
+            return
+
+        await bot.send_message(message.chat.id, BotUI.reminder_created(remind_time, recurrence))
+
+    async def handle_inline_query(self, query: InlineQuery, bot: AsyncTeleBot):
+        """Предпросмотр напоминания в inline-режиме, без обращений к базе"""
+        parsed = TimeInputParser.split(query.query)
+        results = []
+        if parsed is not None and parsed[2]:
+            remind_time, recurrence, text = parsed
+            when = remind_time.strftime('%d.%m.%Y %H:%M')
+            if recurrence:
+                when += f" ({Recurrence.describe(recurrence)})"
+            results.append(InlineQueryResultArticle(
+                id="remind",
+                title=f"⏰ Напомнить {when}",
+                description=text[:100],
+                input_message_content=InputTextMessageContent(f"⏰ Напоминание на {when}: {text}")
+            ))
+        await bot.answer_inline_query(query.id, results, cache_time=0, is_personal=True)
+
+    async def handle_chosen_inline_result(self, result: ChosenInlineResult, bot: AsyncTeleBot):
+        """
+        Создание напоминания из выбранного inline-результата, доставка в личный
+        чат с ботом. Требует включённого inline feedback в @BotFather.
+        """
+        parsed = TimeInputParser.split(result.query)
+        if parsed is None or not parsed[2]:
+            return
+        remind_time, recurrence, text = parsed
+        try:
+            await self.service.create_reminder(ReminderCreate(
+                user_id=result.from_user.id,
+                chat_id=result.from_user.id,
+                text=text,
+                remind_time=remind_time,
+                recurrence=recurrence
+            ))
+        except ValueError as e:
+            logger.warning(f"Inline reminder from {result.from_user.id} rejected: {e}")
+
     async def handle_create_reminder(self, call: CallbackQuery, bot: AsyncTeleBot):
         """Обработчик создания напоминания"""
-        self.components.user_contexts[call.from_user.id] = UserContext(
+        await self.components.user_contexts.set(call.from_user.id, UserContext(
             state=BotState.SET_TEXT,
             data={"chat_id": call.message.chat.id}
-        )
+        ))
         await bot.edit_message_text(
             "Введите текст напоминания:",
             call.message.chat.id,
@@ -401,48 +2745,53 @@ class BotHandlers:
     async def handle_text_input(self, message: Message, bot: AsyncTeleBot):
         """Обработчик текстового ввода"""
         user_id = message.from_user.id
-        if user_id not in self.components.user_contexts:
+        context = await self.components.user_contexts.get(user_id)
+        if context is None:
             return
 
-        context = self.components.user_contexts[user_id]
-
         if context.state == BotState.SET_TEXT:
             context.state = BotState.SET_TIME
             context.data["text"] = message.text
+            await self.components.user_contexts.set(user_id, context)
             await bot.send_message(
                 message.chat.id,
-                "Введите время напоминания (например: 'через 30 минут' или 'завтра в 15:00')",
+                "Введите время напоминания (например: 'через 30 минут', 'завтра в 15:00' "
+                "или 'по будням в 9')",
                 reply_markup=BotUI.cancel_button()
             )
 
         elif context.state == BotState.SET_TIME:
-            remind_time = TimeInputParser.parse(message.text)
+            schedule = TimeInputParser.parse_schedule(message.text)
 
-            if not remind_time:
+            if not schedule:
                 await bot.send_message(
                     message.chat.id,
-                    "Неверный формат времени. Попробуйте снова.",
+                    "Неверный формат времени. Попробуйте снова, например: 'через 1 час 30 минут', "
+                    "'в пятницу в 9', 'послезавтра' или '15 марта в 10:00'.",
                     reply_markup=BotUI.cancel_button()
                 )
                 return
 
+            remind_time, recurrence = schedule
             try:
                 reminder = ReminderCreate(
                     user_id=user_id,
                     chat_id=context.data["chat_id"],
                     text=context.data["text"],
-                    remind_time=remind_time
+                    remind_time=remind_time,
+                    recurrence=recurrence
                 )
 
                 await self.service.create_reminder(reminder)
                 await bot.send_message(
                     message.chat.id,
-                    f"✅ Напоминание создано на {remind_time.strftime('%d.%m.%Y %H:%M')}",
+                    BotUI.reminder_created(remind_time, recurrence),
                     reply_markup=BotUI.main_menu()
                 )
 
                 # Возвращаем в главное меню
                 context.state = BotState.MAIN_MENU
+                await self.components.user_contexts.set(user_id, context)
 
             except ValueError as e:
                 await bot.send_message(
@@ -452,27 +2801,31 @@ class BotHandlers:
                 )
 
     async def handle_list_reminders(self, call: CallbackQuery, bot: AsyncTeleBot):
-        """Обработчик списка напоминаний"""
-        reminders = await self.service.get_user_reminders(call.from_user.id)
-
-        if not reminders:
-            await bot.edit_message_text(
-                "У вас нет активных напоминаний.",
-                call.message.chat.id,
-                call.message.message_id,
-                reply_markup=BotUI.main_menu()
-            )
-            return
-
-        text = "📋 Ваши активные напоминания:\n\n"
-        for reminder in reminders:
-            text += f"• {reminder.text} - {reminder.remind_time.strftime('%d.%m.%Y %H:%M')}\n"
-
+        """Обработчик списка напоминаний и перелистывания страниц"""
+        cache = self.components.list_cache
+        view = cache.get(call.from_user.id, call.data)
+        if view is None:
+            after = before = None
+            if call.data.startswith("list_n_"):
+                after = BotUI.decode_cursor(call.data[len("list_n_"):])
+            elif call.data.startswith("list_p_"):
+                before = BotUI.decode_cursor(call.data[len("list_p_"):])
+            page = await self.service.get_user_reminders(call.from_user.id, after=after, before=before)
+
+            if page.reminders:
+                view = (BotUI.reminders_text(page), BotUI.reminders_list(page))
+                valid_until = AppConfig.Scheduler.TIMEZONE.localize(page.reminders[0].remind_time)
+            else:
+                view = ("У вас нет активных напоминаний.", BotUI.main_menu())
+                valid_until = None
+            cache.set(call.from_user.id, call.data, view, valid_until)
+
+        text, markup = view
         await bot.edit_message_text(
             text,
             call.message.chat.id,
             call.message.message_id,
-            reply_markup=BotUI.reminders_list(reminders)
+            reply_markup=markup
         )
 
     async def handle_delete_reminder(self, call: CallbackQuery, bot: AsyncTeleBot):
@@ -491,11 +2844,36 @@ class BotHandlers:
         else:
             await bot.answer_callback_query(call.id, "Ошибка удаления напоминания!")
 
+    async def handle_snooze(self, call: CallbackQuery, bot: AsyncTeleBot):
+        """Обработчик кнопок "отложить" под доставленным напоминанием"""
+        _, reminder_id, option = call.data.split("_")
+        remind_time = TimeInputParser.parse(BotUI.SNOOZE_OPTIONS[option][1])
+        reminder = await self.service.snooze_reminder(
+            int(reminder_id), call.message.chat.id, remind_time)
+
+        if reminder is None:
+            await bot.answer_callback_query(call.id, "Напоминание уже недоступно")
+            return
+
+        when = remind_time.strftime('%d.%m.%Y %H:%M')
+        await bot.answer_callback_query(call.id, f"Отложено до {when}")
+        # В сводке остаются кнопки остальных напоминаний
+        markup = BotUI.without_snooze(call.message.reply_markup, reminder.id)
+        text = f"{call.message.text}\n💤 Отложено до {when}: {reminder.text[:50]}"
+        if len(text) <= 4096:
+            await bot.edit_message_text(
+                text, call.message.chat.id, call.message.message_id, reply_markup=markup
+            )
+        else:
+            await bot.edit_message_reply_markup(
+                call.message.chat.id, call.message.message_id, reply_markup=markup
+            )
+
     async def handle_cancel(self, call: CallbackQuery, bot: AsyncTeleBot):
         """Обработчик отмены действия"""
-        self.components.user_contexts[call.from_user.id] = UserContext(
+        await self.components.user_contexts.set(call.from_user.id, UserContext(
             state=BotState.MAIN_MENU
-        )
+        ))
         await bot.edit_message_text(
             "Действие отменено.",
             call.message.chat.id,
@@ -504,6 +2882,74 @@ class BotHandlers:
         )
 
 
+## Приём обновлений через webhook
+class WebhookServer:
+    """
+    HTTP-сервер для приёма обновлений Telegram вместо long polling.
+
+    Каждый POST проверяется по секретному токену и сразу получает ответ 200,
+    а обработка идёт в фоне с ограничением числа одновременно обрабатываемых
+    обновлений. При исчерпании лимита сервер не отвечает, пока не освободится
+    слот, и Telegram сам притормаживает доставку.
+    """
+
+    def __init__(self, bot: AsyncTeleBot):
+        self.bot = bot
+        self._slots = asyncio.Semaphore(AppConfig.Webhook.MAX_CONCURRENCY)
+        self._tasks = set()
+        self._runner: Optional[web.AppRunner] = None
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(AppConfig.Webhook.PATH, self.handle_update)
+        return app
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not hmac.compare_digest(secret, AppConfig.Webhook.SECRET_TOKEN):
+            return web.Response(status=403)
+
+        try:
+            update = Update.de_json(await request.json())
+        except (ValueError, KeyError):
+            return web.Response(status=400)
+
+        await self._slots.acquire()
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response()
+
+    async def _process(self, update: Update):
+        try:
+            await self.bot.process_new_updates([update])
+        except Exception as e:
+            logger.error(f"Failed to process update {update.update_id}: {e}")
+        finally:
+            self._slots.release()
+
+    async def start(self):
+        """Запуск HTTP-сервера и регистрация webhook в Telegram"""
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, AppConfig.Webhook.HOST, AppConfig.Webhook.PORT).start()
+        if AppConfig.Webhook.URL:
+            await self.bot.set_webhook(
+                url=AppConfig.Webhook.URL + AppConfig.Webhook.PATH,
+                secret_token=AppConfig.Webhook.SECRET_TOKEN,
+                max_connections=AppConfig.Webhook.MAX_CONNECTIONS
+            )
+        logger.info(f"Webhook listening on {AppConfig.Webhook.HOST}:{AppConfig.Webhook.PORT}")
+
+    async def stop(self):
+        """Остановка сервера с дожиданием начатой обработки"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
 ## Основной цикл приложения
 async def main():
     # Инициализация компонентов
@@ -512,23 +2958,104 @@ async def main():
 
     # Инициализация сервисов
     service = ReminderService(components)
-    await service.restore_reminders()
+    sync_tasks.set_sender(service.send_reminder)
+
+    # Запуск отправки и планировщика
+    run_scheduler = AppConfig.Bot.RUN_SCHEDULER
+    components.dispatcher.start()
+    if run_scheduler:
+        components.outbox.start()
+    # Приостановленный планировщик только сохраняет задания в jobstore
+    components.scheduler.start(paused=not run_scheduler)
+
+    components.scheduler.add_job(
+        components.user_contexts.sweep,
+        trigger=IntervalTrigger(seconds=AppConfig.Bot.STATE_SWEEP_INTERVAL),
+        id="state_sweep",
+        jobstore="memory",
+        replace_existing=True
+    )
+
+    components.scheduler.add_job(
+        components.log_metrics,
+        trigger=IntervalTrigger(seconds=AppConfig.Bot.METRICS_INTERVAL),
+        id="metrics",
+        jobstore="memory",
+        replace_existing=True
+    )
+
+    if not AppConfig.Scheduler.BATCH_MODE and AppConfig.Bot.STATE_BACKEND == "database":
+        # Задания, добавленные в jobs.db другими процессами, планировщик
+        # замечает только при пробуждении
+        components.scheduler.add_job(
+            components.scheduler.wakeup,
+            trigger=IntervalTrigger(seconds=AppConfig.Scheduler.TICK_INTERVAL),
+            id="jobstore_poll",
+            jobstore="memory",
+            replace_existing=True
+        )
+
+    if AppConfig.Retention.ENABLED and run_scheduler:
+        components.scheduler.add_job(
+            service.compact_reminders,
+            trigger=IntervalTrigger(seconds=AppConfig.Retention.INTERVAL),
+            id="retention",
+            jobstore="memory",
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
 
-    # Запуск планировщика
-    components.scheduler.start()
+    # Восстановление идёт в фоне, бот принимает обновления сразу
+    restore_task = asyncio.create_task(service.restore_reminders()) if run_scheduler else None
 
     # Инициализация обработчиков
     BotHandlers(components, service)
 
     # Запуск бота
     logger.info("Starting bot...")
+    webhook = WebhookServer(components.bot) if AppConfig.Webhook.ENABLED else None
     try:
-        await components.bot.polling(none_stop=True, timeout=AppConfig.Bot.TIMEOUT)
+        if webhook:
+            await webhook.start()
+            await asyncio.Event().wait()
+        else:
+            await components.bot.polling(none_stop=True, timeout=AppConfig.Bot.TIMEOUT)
     finally:
-        await components.cleanup()
+        if webhook:
+            await webhook.stop()
+        if restore_task:
+            restore_task.cancel()
         components.scheduler.shutdown()
+        await components.dispatcher.stop()
+        await components.timer.stop()
+        await components.outbox.stop()
+        await components.cleanup()
         logger.info("Bot stopped")
 
 
+async def vacuum():
+    """Перевод существующей reminders.db в auto_vacuum=INCREMENTAL полным VACUUM"""
+    engine = create_async_engine(AppConfig.Database.URL, echo=AppConfig.Database.ECHO)
+    use_sqlite_pragmas(engine.sync_engine)
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar() == 2:
+            logger.info("Database is already in incremental auto_vacuum mode")
+        else:
+            await conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+            logger.info("Switching database to incremental auto_vacuum, running VACUUM")
+            started = time.monotonic()
+            await conn.exec_driver_sql("VACUUM")
+            logger.info(f"VACUUM finished in {time.monotonic() - started:.1f} s")
+    await engine.dispose()
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Telegram бот напоминаний")
+    parser.add_argument("--vacuum", action="store_true",
+                        help="перевести reminders.db в auto_vacuum=INCREMENTAL (полный VACUUM) и выйти")
+    if parser.parse_args().vacuum:
+        asyncio.run(vacuum())
+    else:
+        asyncio.run(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Массовый импорт напоминаний из CSV или JSONL.
+
+Каждая запись содержит поля user_id, chat_id, text и remind_time (ISO 8601,
+время без зоны считается временем AppConfig.Scheduler.TIMEZONE).
+
+Запуск: python import_reminders.py reminders.jsonl [--chunk 1000] [--worker-id 1023]
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import time
+from typing import Iterator
+
+from loguru import logger
+
+from bot import AppConfig, BotComponents, ReminderService
+
+
+def read_records(path: str, fmt: str) -> Iterator[dict]:
+    """Построчное чтение файла без загрузки его целиком"""
+    with open(path, encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+async def run_import(path: str, fmt: str, chunk: int, worker_id: int):
+    components = BotComponents()
+    await components.init_db()
+    # Планировщик нужен только для записи заданий в jobstore, задания не выполняются
+    components.scheduler.start(paused=True)
+    # Свой номер процесса: job_id не совпадают с выданными работающим ботом
+    service = ReminderService(components, worker_id)
+
+    started = time.perf_counter()
+    try:
+        created, rejected = await service.create_reminders_bulk(read_records(path, fmt), chunk)
+    finally:
+        components.scheduler.shutdown(wait=False)
+        await components.cleanup()
+    elapsed = time.perf_counter() - started
+
+    logger.info(
+        f"Импортировано {created}, отклонено {rejected} за {elapsed:.1f} с "
+        f"({created / elapsed if elapsed else 0:.0f} напоминаний/с)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="файл .csv или .jsonl")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="по умолчанию по расширению файла")
+    parser.add_argument("--chunk", type=int, default=AppConfig.Database.BULK_CHUNK)
+    parser.add_argument("--worker-id", type=int, default=AppConfig.Scheduler.IMPORT_WORKER_ID,
+                        help="номер процесса в job_id (0-1023), отличный от WORKER_ID ботов")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "jsonl")
+    asyncio.run(run_import(args.path, fmt, args.chunk, args.worker_id))
+
+
+if __name__ == "__main__":
+    main()
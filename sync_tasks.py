@@ -1,24 +1,29 @@
-from telebot import TeleBot
+from typing import Awaitable, Callable, Optional
+
 from loguru import logger
-from bot import AppConfig
+
+# Задания планировщика хранятся в jobstore по текстовой ссылке
+# "sync_tasks:send_reminder", поэтому сама функция остаётся здесь,
+# а фактическую отправку выполняет зарегистрированный при старте
+# ReminderService через уже запущенный AsyncTeleBot.
+_sender: Optional[Callable[[int, str, Optional[str]], Awaitable[None]]] = None
 
 
-def send_reminder(chat_id: int, text: str):
-    """Синхронная функция для отправки напоминаний"""
-    try:
-        bot = TeleBot(AppConfig.Bot.TOKEN)
-        bot.send_message(chat_id, f"⏰ Напоминание: {text}")
-    except Exception as e:
-        logger.error(f"Failed to send reminder: {e}")
+def set_sender(sender: Callable[[int, str, Optional[str]], Awaitable[None]]):
+    """Регистрация корутины, через которую отправляются напоминания"""
+    global _sender
+    _sender = sender
 
 
-def send_reminder_with_retry(chat_id: int, text: str, max_retries=3):
-    """Функция с повторными попытками"""
-    for attempt in range(max_retries):
-        try:
-            send_reminder(chat_id, text)
-            break
-        except Exception as e:
-            if attempt == max_retries - 1:
-                logger.error(f"Failed after {max_retries} attempts: {e}")
+async def send_reminder(chat_id: int, text: str, job_id: Optional[str] = None):
+    """
+    Отправка сработавшего напоминания через общий асинхронный клиент.
+    job_id связывает срабатывание со строкой напоминания (кнопки "отложить",
+    следующее срабатывание повторяющегося); старые задания без него
+    остаются совместимы.
+    """
+    if _sender is None:
+        logger.error(f"Reminder sender is not configured, dropping reminder for {chat_id}")
+        return
+    await _sender(chat_id, text, job_id)
 
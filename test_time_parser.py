@@ -0,0 +1,154 @@
+"""
+Свойства грамматики TimeInputParser на случайных входах.
+
+Запуск: python -m unittest test_time_parser
+"""
+
+import random
+import unittest
+from datetime import datetime, timedelta
+
+from bot import AppConfig, Recurrence, TimeInputParser
+
+TZ = AppConfig.Scheduler.TIMEZONE
+
+UNIT_WORDS = {
+    "minutes": ["минут", "минуты", "мин", "minutes", "min", "м"],
+    "hours": ["час", "часа", "часов", "hours", "hour", "ч"],
+    "days": ["день", "дня", "дней", "суток", "days", "д"],
+    "weeks": ["неделю", "недели", "недель", "weeks"],
+}
+MONTHS = ["января", "февраля", "марта", "апреля", "мая", "июня", "июля", "августа",
+          "сентября", "октября", "ноября", "декабря"]
+
+
+class CompoundDurationTest(unittest.TestCase):
+    def test_sum_of_parts(self):
+        """Составной интервал "через N1 u1 [и] N2 u2 ..." - текущее время плюс сумма частей"""
+        rnd = random.Random(20)
+        for _ in range(2000):
+            words, expected = [rnd.choice(["через", "in"])], timedelta()
+            for unit in rnd.sample(list(UNIT_WORDS), rnd.randint(1, 4)):
+                amount = rnd.randint(1, 500)
+                expected += timedelta(**{unit: amount})
+                words += [str(amount), rnd.choice(UNIT_WORDS[unit])]
+                if rnd.random() < 0.3:
+                    words.append(rnd.choice(["и", "and"]))
+            if words[-1] in ("и", "and"):
+                words.pop()
+            text = " ".join(words)
+
+            before = datetime.now(TZ)
+            result = TimeInputParser.parse(text)
+            after = datetime.now(TZ)
+            self.assertIsNotNone(result, text)
+            self.assertTrue(before + expected <= result <= after + expected, text)
+
+    def test_zero_amount_is_not_in_future(self):
+        result = TimeInputParser.parse("через 0 минут")
+        self.assertIsNotNone(result)
+        self.assertLessEqual(result, datetime.now(TZ))
+
+    def test_out_of_range_is_rejected(self):
+        """Выход за пределы datetime - None, а не исключение"""
+        for text in ("через " + "9999 недель " * 50, "01.01.0001 00:00", "31.12.9999 23:59",
+                     "1 января 1 в 0:00"):
+            self.assertIsNone(TimeInputParser.parse(text), text[:30])
+            TimeInputParser.split(text + " текст")
+
+    def test_trailing_text_is_rejected(self):
+        for text in ("через 5 минут минералку", "через 2 часа дня рождения", "через"):
+            self.assertIsNone(TimeInputParser.parse(text), text)
+
+
+class RoundTripTest(unittest.TestCase):
+    def test_formatted_dates(self):
+        """Будущая дата, записанная любой поддерживаемой формой, разбирается обратно"""
+        rnd = random.Random(21)
+        now = datetime.now(TZ)
+        for _ in range(2000):
+            moment = (now + timedelta(days=rnd.randint(1, 360))).replace(
+                hour=rnd.randint(0, 23), minute=rnd.randint(0, 59), second=0, microsecond=0)
+            forms = (
+                f"{moment.day} {MONTHS[moment.month - 1]} в {moment:%H:%M}",
+                f"{moment.day} {MONTHS[moment.month - 1]} {moment.year} в {moment:%H:%M}",
+                f"{moment:%d.%m} {moment:%H:%M}",
+                f"{moment:%d.%m.%Y} {moment:%H:%M}",
+            )
+            for text in forms:
+                self.assertEqual(TimeInputParser.parse(text), moment, text)
+
+    def test_weekdays(self):
+        """День недели - ближайший в будущем, не дальше недели"""
+        rnd = random.Random(22)
+        names = ["понедельник", "вторник", "среду", "четверг", "пятницу", "субботу", "воскресенье"]
+        for _ in range(500):
+            weekday, hour, minute = rnd.randrange(7), rnd.randint(0, 23), rnd.randint(0, 59)
+            text = f"в {names[weekday]} в {hour}:{minute:02d}"
+            now = datetime.now(TZ)
+            result = TimeInputParser.parse(text)
+            self.assertIsNotNone(result, text)
+            self.assertEqual((result.weekday(), result.hour, result.minute), (weekday, hour, minute))
+            self.assertTrue(now < result <= now + timedelta(days=7), text)
+
+
+class RecurringTest(unittest.TestCase):
+    def test_implied_unit_with_time(self):
+        """Слова с единицей повтора ("ежедневно", "weekly") допускают время и день недели"""
+        for text, rule, weekday, hour in (
+            ("ежедневно в 10", "daily", None, 10),
+            ("daily at 10", "daily", None, 10),
+            ("еженедельно в пятницу", "weekly", 4, 9),
+            ("weekly on monday at 10", "weekly", 0, 10),
+            ("каждую неделю в среду в 8:30", "weekly", 2, 8),
+        ):
+            schedule = TimeInputParser.parse_schedule(text)
+            self.assertIsNotNone(schedule, text)
+            first, parsed_rule = schedule
+            self.assertEqual(parsed_rule, rule, text)
+            self.assertEqual(first.hour, hour, text)
+            if weekday is not None:
+                self.assertEqual(first.weekday(), weekday, text)
+
+    def test_implied_unit_in_command(self):
+        result = TimeInputParser.split("ежедневно в 10 пить воду")
+        self.assertIsNotNone(result)
+        self.assertEqual((result[0].hour, result[1], result[2]), (10, "daily", "пить воду"))
+
+    def test_interval_fits_rule(self):
+        """Слишком длинный интервал отклоняется парсером, а не валидатором модели"""
+        self.assertEqual(TimeInputParser.parse_schedule("каждые 416 дней")[1], "every:9984h")
+        self.assertIsNone(TimeInputParser.parse_schedule("каждые 500 дней"))
+        self.assertIsNone(TimeInputParser.parse_schedule("каждые 60 недель"))
+
+    def test_cron_weekdays(self):
+        """Дни недели crontab: 0 и 7 - воскресенье, шаг и диапазоны через воскресенье"""
+        for field, expected in (("*/2", "sun,tue,thu,sat"), ("0-4", "sun,mon,tue,wed,thu"),
+                                ("1-5", "mon,tue,wed,thu,fri"), ("7", "sun"), ("mon-fri", "mon-fri")):
+            self.assertEqual(Recurrence._cron_weekdays(field), expected, field)
+            self.assertIsNotNone(TimeInputParser.parse_schedule(f"cron 0 9 * * {field}"), field)
+        self.assertIsNone(TimeInputParser.parse_schedule("cron 0 9 * * 8"))
+
+    def test_weekday_needs_weekly_rule(self):
+        self.assertIsNone(TimeInputParser.parse_schedule("ежедневно в пятницу"))
+
+
+class SplitTest(unittest.TestCase):
+    def test_text_words_are_kept(self):
+        """Слова текста, похожие на месяц или день недели, остаются в тексте"""
+        for text, rest in (
+            ("в 9 марафон подготовиться", "марафон подготовиться"),
+            ("at 9 market run", "market run"),
+            ("в 7 майонез купить", "майонез купить"),
+            ("at 10 wedding planning", "wedding planning"),
+            ("в 9 wedding", "wedding"),
+            ("через 1 час 30 минут купить молоко", "купить молоко"),
+            ("15 марта в 10:00 позвонить", "позвонить"),
+        ):
+            result = TimeInputParser.split(text)
+            self.assertIsNotNone(result, text)
+            self.assertEqual(result[2], rest, text)
+
+
+if __name__ == "__main__":
+    unittest.main()